@@ -0,0 +1,166 @@
+# The do_something workload of tutorial_8 with asyncio, one thread waits for all the sleeps
+# tutorial_8 says it itself: do_something only waits. A thread per wait costs a thread stack and
+# a switch of the OS scheduler, a coroutine waiting on asyncio.sleep is only an object in the event loop
+
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on windows, the peak RSS is then shown as "?"
+    resource = None
+
+# ru_maxrss is in kilobytes on linux and in bytes on macOS
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+async def do_something(seconds):
+    # Same as tutorial_8 without the print, 10,000 prints would be all the benchmark measures
+    await asyncio.sleep(seconds)
+    return f"Done Sleeping for {seconds} second..."
+
+
+async def run_gather(secs):
+    # The results come back in the same order as secs, like executor.map
+    return await asyncio.gather(*(do_something(seconds) for seconds in secs))
+
+
+async def run_task_group(secs):
+    # asyncio.TaskGroup (Python 3.11): if one task fails the others are cancelled
+    # and the error is raised when the block ends, gather would let them keep running
+    if not hasattr(asyncio, "TaskGroup"):
+        return await run_gather(secs)
+    async with asyncio.TaskGroup() as group:
+        tasks = [group.create_task(do_something(seconds)) for seconds in secs]
+    return [task.result() for task in tasks]
+
+
+# The thread versions, with do_something as in tutorial_8
+def do_something_blocking(seconds):
+    time.sleep(seconds)
+    return f"Done Sleeping for {seconds} second..."
+
+
+def run_synchronous(secs):
+    return [do_something_blocking(seconds) for seconds in secs]
+
+
+def run_threads(secs):
+    # One threading.Thread per task, the results go into a list slot instead of a queue
+    results = [None] * len(secs)
+
+    def target(index, seconds):
+        results[index] = do_something_blocking(seconds)
+
+    threads = [threading.Thread(target=target, args=[index, seconds]) for index, seconds in enumerate(secs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def run_pool_submit(secs):
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        futures = [executor.submit(do_something_blocking, seconds) for seconds in secs]
+        return [future.result() for future in futures]
+
+
+def run_pool_map(secs):
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        return list(executor.map(do_something_blocking, secs))
+
+
+MODES = {
+    "synchronous": run_synchronous,
+    "threading.Thread": run_threads,
+    "ThreadPoolExecutor.submit": run_pool_submit,
+    "ThreadPoolExecutor.map": run_pool_map,
+    "asyncio.gather": lambda secs: asyncio.run(run_gather(secs)),
+    "asyncio.TaskGroup": lambda secs: asyncio.run(run_task_group(secs)),
+}
+
+
+def measure(mode, n, seconds):
+    # Runs in a new process (see benchmark), so the peak RSS is the one of this mode alone
+    # The number of threads is sampled by a thread of its own, which is not counted
+    peak_threads = threading.active_count()
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak_threads
+        while not done.wait(0.005):
+            peak_threads = max(peak_threads, threading.active_count() - 1)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    results = MODES[mode]([seconds] * n)
+    finish = time.perf_counter()
+    done.set()
+    sampler.join()
+
+    assert len(results) == n
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT if resource is not None else None
+    return {"wall_time": finish - start, "max_rss": max_rss, "threads": peak_threads}
+
+
+def shortest_time(mode, n, seconds):
+    # The least time a mode can take: one sleep after the other, or rounds of as many sleeps as there are threads
+    if mode == "synchronous":
+        return n * seconds
+    if mode.startswith("ThreadPoolExecutor"):
+        # The default max_workers of ThreadPoolExecutor
+        workers = min(32, (os.cpu_count() or 1) + 4)
+        return -(-n // workers) * seconds
+    return seconds
+
+
+def benchmark(sizes=(10, 1_000, 10_000), seconds=0.05, max_seconds=30):
+    # Every measurement in a fresh "spawn" process, a fork would start with the memory of this one
+    # A mode that cannot finish in max_seconds is not run, its shortest possible time is shown instead
+    context = multiprocessing.get_context("spawn")
+    for n in sizes:
+        print("Benchmark, {} tasks sleeping {} second(s)".format(n, seconds))
+        for mode in MODES:
+            if shortest_time(mode, n, seconds) > max_seconds:
+                print(f"{mode:<27} skipped, would take at least {round(shortest_time(mode, n, seconds))} second(s)")
+                continue
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(measure, mode, n, seconds).result()
+            max_rss = round(result["max_rss"] / 1024 ** 2, 1) if result["max_rss"] is not None else "?"
+            print(
+                f"{mode:<27} {round(result['wall_time'], 3):>7} second(s), "
+                f"peak RSS {max_rss:>6} MB, {result['threads']:>5} thread(s)"
+            )
+        print()
+
+
+def main():
+    # Example 3 of tutorial_8 with asyncio
+    start = time.perf_counter()
+    for result in asyncio.run(run_gather([3, 2.5, 1.5, 1])):
+        print(result)
+    finish = time.perf_counter()
+    print(f"Finished in {round(finish-start, 2)} second(s)")
+    print()
+
+    start = time.perf_counter()
+    for result in asyncio.run(run_task_group([1.5] * 10)):
+        print(result)
+    finish = time.perf_counter()
+    print(f"Finished in {round(finish-start, 2)} second(s)")
+    print()
+
+    benchmark()
+
+
+# Needed for the spawn processes of the benchmark, they import this module
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# Directory listing in Python with os.scandir, instead of starting "ls -la" and parsing its text
+
+import collections
+import concurrent.futures
+import functools
+import itertools
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+import time
+
+try:
+    import grp
+    import pwd
+except ImportError:
+    # windows, the owner and group are shown as numbers
+    grp = pwd = None
+
+# With a pool the names are stat'ed in batches, one future per name costs more than the stat itself
+STAT_BATCH = 64
+# How many batches are in flight per thread
+IN_FLIGHT_PER_THREAD = 4
+# ls -l shows the year instead of the time for files older (or newer) than about six months
+SIX_MONTHS = 365.2425 / 2 * 24 * 60 * 60
+
+
+class Entry(object):
+    # One line of "ls -la", the fields come from os.lstat (a symlink is shown, not followed)
+    # The name is all that is needed to filter, so it is known before any stat call
+
+    def __init__(self, name, path, st, target=None):
+        self.name = name
+        self.path = path
+        self.mode = st.st_mode
+        self.nlink = st.st_nlink
+        self.uid = st.st_uid
+        self.gid = st.st_gid
+        self.size = st.st_size
+        self.mtime = st.st_mtime
+        # st_blocks is in 512 byte units, it does not exist on windows
+        self.blocks = getattr(st, "st_blocks", 0)
+        self.target = target
+
+    @property
+    def is_dir(self):
+        return stat.S_ISDIR(self.mode)
+
+    @property
+    def is_symlink(self):
+        return stat.S_ISLNK(self.mode)
+
+    @property
+    def permissions(self):
+        # -rw-r--r-- / drwxr-xr-x / lrwxrwxrwx
+        return stat.filemode(self.mode)
+
+    @property
+    def owner(self):
+        return _user_name(self.uid)
+
+    @property
+    def group(self):
+        return _group_name(self.gid)
+
+    def date(self, now=None):
+        now = time.time() if now is None else now
+        modified = time.localtime(self.mtime)
+        month = time.strftime("%b", modified)
+        if abs(now - self.mtime) < SIX_MONTHS:
+            return "{} {:>2} {}".format(month, modified.tm_mday, time.strftime("%H:%M", modified))
+        return "{} {:>2}  {}".format(month, modified.tm_mday, modified.tm_year)
+
+    def __repr__(self):
+        return "Entry({!r}, {}, {} bytes)".format(self.name, self.permissions, self.size)
+
+
+@functools.lru_cache(maxsize=None)
+def _user_name(uid):
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except (AttributeError, KeyError):
+        return str(uid)
+
+
+@functools.lru_cache(maxsize=None)
+def _group_name(gid):
+    try:
+        return grp.getgrgid(gid).gr_name
+    except (AttributeError, KeyError):
+        return str(gid)
+
+
+def _make_entry(name, path):
+    # None when the file was deleted after the directory was read, ls skips it too
+    try:
+        st = os.lstat(path)
+        target = os.readlink(path) if stat.S_ISLNK(st.st_mode) else None
+    except FileNotFoundError:
+        return None
+    return Entry(name, path, st, target)
+
+
+def _make_entries(path, names):
+    entries = (_make_entry(name, os.path.join(path, name)) for name in names)
+    return [entry for entry in entries if entry is not None]
+
+
+def scan(path=".", name_contains=None, match=None, all=True, threads=None):
+    # Yields an Entry for every name in path, in the order of the directory (not sorted)
+    #   name_contains - only names containing this text, like "ls -la | grep tutorial"
+    #   match         - a function name -> bool for any other filter
+    #   all           - include the names starting with a dot, and "." and "..", like ls -a
+    #   threads       - number of threads doing the stat calls, worth it on a network drive
+    #                   or a directory with a lot of files, None does them one after another
+    # The names are filtered before anything is stat'ed, so skipped files cost nothing
+    def names():
+        if all:
+            yield "."
+            yield ".."
+        with os.scandir(path) as entries:
+            for entry in entries:
+                yield entry.name
+
+    selected = (
+        name
+        for name in names()
+        if (all or not name.startswith("."))
+        and (name_contains is None or name_contains in name)
+        and (match is None or match(name))
+    )
+
+    if not threads:
+        for name in selected:
+            entry = _make_entry(name, os.path.join(path, name))
+            if entry is not None:
+                yield entry
+        return
+
+    # Like executor.map, but only a few batches are in flight at a time,
+    # so the first entries come out before the whole directory has been read
+    batches = iter(lambda: list(itertools.islice(selected, STAT_BATCH)), [])
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        in_flight = collections.deque()
+        for batch in itertools.islice(batches, threads * IN_FLIGHT_PER_THREAD):
+            in_flight.append(executor.submit(_make_entries, path, batch))
+
+        while in_flight:
+            future = in_flight.popleft()
+            for batch in itertools.islice(batches, 1):
+                in_flight.append(executor.submit(_make_entries, path, batch))
+            yield from future.result()
+
+
+def listing(path=".", **kwargs):
+    # The entries sorted by name like ls, kwargs are passed to scan
+    return sorted(scan(path, **kwargs), key=lambda entry: entry.name)
+
+
+def render(entries):
+    # The text "ls -la" would print for these entries, the columns are as wide as their widest value
+    entries = list(entries)
+    now = time.time()
+    rows = [
+        (
+            entry.permissions,
+            str(entry.nlink),
+            entry.owner,
+            entry.group,
+            str(entry.size),
+            entry.date(now),
+            entry.name if entry.target is None else "{} -> {}".format(entry.name, entry.target),
+        )
+        for entry in entries
+    ]
+    widths = [max((len(row[column]) for row in rows), default=0) for column in range(5)]
+
+    # ls counts the blocks in kilobytes
+    lines = ["total {}".format(sum(entry.blocks for entry in entries) // 2)]
+    for permissions, nlink, owner, group, size, date, name in rows:
+        lines.append(
+            "{} {:>{}} {:<{}} {:<{}} {:>{}} {} {}".format(
+                permissions,
+                nlink,
+                widths[1],
+                owner,
+                widths[2],
+                group,
+                widths[3],
+                size,
+                widths[4],
+                date,
+                name,
+            )
+        )
+    return "\n".join(lines) + "\n"
+
+
+def ls_la(path=".", **kwargs):
+    return render(listing(path, **kwargs))
+
+
+def spawn_and_parse(path=".", name_contains="tutorial"):
+    # The tutorial_7 way: "ls -la" in a new process, then the text is split to get the name column
+    p1 = subprocess.run(["ls", "-la", path], capture_output=True, text=True)
+    names = []
+    for line in p1.stdout.splitlines()[1:]:
+        name = line.split(None, 8)[-1]
+        if name_contains in name:
+            names.append(name)
+    return names
+
+
+def benchmark(n=20_000, repeat=50):
+    print("Benchmark, names containing 'tutorial' in this directory, {} times".format(repeat))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        spawn_and_parse(".")
+    finish = time.perf_counter()
+    print(f"ls -la and parse: {round((finish-start) / repeat * 1e3, 2)} millisecond(s) per listing")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        [entry.name for entry in scan(".", name_contains="tutorial")]
+    finish = time.perf_counter()
+    print(f"scan:             {round((finish-start) / repeat * 1e3, 2)} millisecond(s) per listing")
+    print()
+
+    print("Benchmark, full listing of a directory with {} files".format(n))
+    directory = tempfile.mkdtemp()
+    try:
+        for i in range(n):
+            open(os.path.join(directory, "file_{}.txt".format(i)), "w").close()
+
+        start = time.perf_counter()
+        subprocess.run(["ls", "-la", directory], capture_output=True, text=True)
+        finish = time.perf_counter()
+        print(f"ls -la:            {round(finish-start, 3)} second(s)")
+
+        for threads in (None, 4, 16):
+            start = time.perf_counter()
+            render(listing(directory, threads=threads))
+            finish = time.perf_counter()
+            print(f"ls_la threads={threads!s:<4}: {round(finish-start, 3)} second(s)")
+    finally:
+        shutil.rmtree(directory)
+    print()
+
+
+def main():
+    print(ls_la("."))
+
+    # Only the tutorial files, the entries come out one at a time as they are stat'ed
+    for entry in scan(".", name_contains="tutorial", threads=4):
+        print(entry.name, entry.size)
+    print()
+
+    # The same names as "cat output.txt | grep tutorial | awk '{ print $9 }'" in tutorial_7
+    print(sorted(entry.name for entry in scan(".", match=lambda name: name.startswith("tutorial_"))))
+    print()
+
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# Cached email/fullname properties that are cleared whenever the name changes
+
+import time
+
+
+class cached_property(object):
+    # Works like the property decorator from tutorial_6 (getter, setter and deleter)
+    # but the value returned by the getter is kept in the instance namespace
+    # and only computed again after it has been invalidated
+
+    def __init__(self, fget, fset=None, fdel=None):
+        self.fget = fget
+        self.fset = fset
+        self.fdel = fdel
+        self.cache_name = cache_name(fget.__name__)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return instance.__dict__[self.cache_name]
+        except KeyError:
+            value = instance.__dict__[self.cache_name] = self.fget(instance)
+            return value
+
+    def __set__(self, instance, value):
+        if self.fset is None:
+            raise AttributeError("can't set attribute")
+        self.fset(instance, value)
+        instance.__dict__.pop(self.cache_name, None)
+
+    def __delete__(self, instance):
+        if self.fdel is None:
+            raise AttributeError("can't delete attribute")
+        self.fdel(instance)
+        instance.__dict__.pop(self.cache_name, None)
+
+    def setter(self, fset):
+        return type(self)(self.fget, fset, self.fdel)
+
+    def deleter(self, fdel):
+        return type(self)(self.fget, self.fset, fdel)
+
+
+class invalidating_attribute(object):
+    # A plain attribute that clears the cached properties depending on it every time it is assigned
+    # first = invalidating_attribute("email", "fullname") means that emp.first = "Jim"
+    # will recompute email and fullname on their next access
+
+    def __init__(self, *dependents):
+        self.cache_names = [cache_name(name) for name in dependents]
+
+    def __set_name__(self, owner, name):
+        # The value is stored under the same name in the instance namespace
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name) from None
+
+    def __set__(self, instance, value):
+        namespace = instance.__dict__
+        namespace[self.name] = value
+        for name in self.cache_names:
+            namespace.pop(name, None)
+
+
+def cache_name(name):
+    return "_cached_" + name
+
+
+# Employee from tutorial_6
+class Employee(object):
+    def __init__(self, first, last):
+        self.first = first
+        self.last = last
+
+    @property
+    def email(self):
+        return "{}.{}@company.com".format(self.first, self.last)
+
+    @property
+    def fullname(self):
+        return "{} {}".format(self.first, self.last)
+
+    @fullname.setter
+    def fullname(self, name):
+        first, last = name.split(" ")
+        self.first = first
+        self.last = last
+
+    @fullname.deleter
+    def fullname(self):
+        self.first = None
+        self.last = None
+
+
+class CachedEmployee(object):
+
+    # Assigning first or last, directly or through the fullname setter and deleter, clears both caches
+    first = invalidating_attribute("email", "fullname")
+    last = invalidating_attribute("email", "fullname")
+
+    def __init__(self, first, last):
+        self.first = first
+        self.last = last
+
+    @cached_property
+    def email(self):
+        return "{}.{}@company.com".format(self.first, self.last)
+
+    @cached_property
+    def fullname(self):
+        return "{} {}".format(self.first, self.last)
+
+    @fullname.setter
+    def fullname(self, name):
+        first, last = name.split(" ")
+        self.first = first
+        self.last = last
+
+    @fullname.deleter
+    def fullname(self):
+        self.first = None
+        self.last = None
+
+
+def benchmark(n=1_000, reads=1_000):
+    print("Benchmark of {} employees, email and fullname read {} times each".format(n, reads))
+    print()
+
+    for emp_cls in (Employee, CachedEmployee):
+        employees = [emp_cls("Test{}".format(i), "User") for i in range(n)]
+
+        start = time.perf_counter()
+        for _ in range(reads):
+            for emp in employees:
+                emp.email
+                emp.fullname
+        finish = time.perf_counter()
+        print(f"{emp_cls.__name__:<28} {round(finish-start, 3)} second(s)")
+
+    # Read-heavy with a rename every 100 reads, the cache has to be rebuilt after each one
+    employees = [CachedEmployee("Test{}".format(i), "User") for i in range(n)]
+    start = time.perf_counter()
+    for i in range(reads):
+        for emp in employees:
+            if i % 100 == 0:
+                emp.last = "User{}".format(i)
+            emp.email
+            emp.fullname
+    finish = time.perf_counter()
+    print(f"{'CachedEmployee with renames':<28} {round(finish-start, 3)} second(s)")
+    print()
+
+
+def main():
+    emp_1 = CachedEmployee("John", "Smith")
+    emp_2 = CachedEmployee("Steve", "Doe")
+
+    print(emp_1.first)
+    print(emp_1.email)
+    print(emp_1.fullname)
+    print()
+
+    # Direct assignment clears the cache
+    emp_1.first = "Jim"
+    print(emp_1.first)
+    print(emp_1.email)
+    print(emp_1.fullname)
+    print()
+
+    # So does the setter
+    emp_2.fullname = "Jane Doe"
+    print(emp_2.first)
+    print(emp_2.email)
+    print(emp_2.fullname)
+    print()
+
+    # And the deleter
+    del emp_1.fullname
+    print(emp_1.first)
+    print(emp_1.email)
+    print(emp_1.fullname)
+    print()
+
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# Business-day calendar - workday checks, counts and next workday for whole arrays of dates at once
+
+import datetime
+import time
+
+import numpy as np
+
+
+class Employee(object):
+
+    num_of_emps = 0
+    raise_amount = 1.04
+
+    def __init__(self, first, last, pay):
+        self.first = first
+        self.last = last
+        self.pay = pay
+        self.email = first + "." + last + "@company.com"
+
+        Employee.num_of_emps += 1
+
+    def fullname(self):
+        return "{} {}".format(self.first, self.last)
+
+    def apply_raise(self):
+        self.pay = int(self.pay * self.raise_amount)
+
+    @staticmethod
+    def is_workday(day):
+        # Scalar fast path for a single date, weekday() is called once
+        # weekday: 0 is monday and 6 is sunday, so 5 and 6 are the weekend
+        # Holidays are not known here, use a BusinessCalendar for those
+        return day.weekday() < 5
+
+
+class BusinessCalendar(object):
+    # All the work is done once in __init__:
+    #   _workday[i] is True when the i-th day after start is a workday (the bitmap)
+    #   _before[i]  is the number of workdays before the i-th day (a running count)
+    #   _next[i]    is the index of the first workday on or after the i-th day
+    # After that every question is an array lookup, so a million dates are answered in one call
+
+    def __init__(self, start, end, holidays=(), weekend=(5, 6)):
+        # start and end are datetime.date, both included
+        self.start = np.datetime64(start, "D")
+        self.end = np.datetime64(end, "D")
+        if self.end < self.start:
+            raise ValueError("end must not be before start")
+
+        days = self.start + np.arange((self.end - self.start).astype(int) + 1)
+        # 1970-01-01 was a thursday, so (days since epoch + 3) % 7 gives 0 for monday like weekday()
+        weekdays = (days.astype(np.int64) + 3) % 7
+        workday = ~np.isin(weekdays, list(weekend))
+
+        holidays = np.asarray(list(holidays), dtype="datetime64[D]")
+        holidays = holidays[(holidays >= self.start) & (holidays <= self.end)]
+        workday[(holidays - self.start).astype(np.int64)] = False
+        self._workday = workday
+
+        self._before = np.zeros(len(workday) + 1, dtype=np.int64)
+        np.cumsum(workday, out=self._before[1:])
+
+        # Index of each workday, a large number for the other days, then a running minimum from the end
+        # One extra slot past the end points outside the bitmap, that is how "no workday left" is detected
+        positions = np.where(workday, np.arange(len(workday)), len(workday))
+        following = np.minimum.accumulate(positions[::-1])[::-1]
+        self._next = np.append(following, len(workday))
+
+    def _offsets(self, dates, extra=0):
+        # Turns dates into positions in the bitmap, refusing dates outside of the calendar
+        offsets = (np.asarray(dates, dtype="datetime64[D]") - self.start).astype(np.int64)
+        if offsets.size and (offsets.min() < 0 or offsets.max() >= len(self._workday) + extra):
+            raise ValueError("dates must be between {} and {}".format(self.start, self.end))
+        return offsets
+
+    def is_workday(self, dates):
+        return self._workday[self._offsets(dates)]
+
+    def count_workdays(self, starts, ends):
+        # Workdays in [start, end), the end date itself is not counted (like np.busday_count)
+        # The day after the calendar's end is accepted as an end date
+        return self._before[self._offsets(ends, extra=1)] - self._before[self._offsets(starts, extra=1)]
+
+    def next_workday(self, dates, include_today=False):
+        # The first workday after each date, or on it when include_today is True
+        offsets = self._offsets(dates)
+        if not include_today:
+            offsets = offsets + 1
+        following = self._next[offsets]
+        if following.size and following.max() >= len(self._workday):
+            raise ValueError("no workday left before {}".format(self.end))
+        return self.start + following
+
+    def prorate(self, pays, starts, ends, period_start, period_end):
+        # Pay for a period when employees only worked part of it
+        # pays, starts and ends have one entry per employee (ends excluded, like count_workdays)
+        # Each pay is multiplied by the share of the period's workdays the employee was there for
+        period_start = np.datetime64(period_start, "D")
+        period_end = np.datetime64(period_end, "D")
+        starts = np.clip(np.asarray(starts, dtype="datetime64[D]"), period_start, period_end)
+        ends = np.clip(np.asarray(ends, dtype="datetime64[D]"), period_start, period_end)
+
+        worked = self.count_workdays(starts, ends)
+        total = self.count_workdays([period_start], [period_end])[0]
+        if total == 0:
+            raise ValueError("no workday between {} and {}".format(period_start, period_end))
+        # Integer division, a pay never goes through a float, the same truncation as apply_raise for positive pays
+        return np.asarray(pays, dtype=np.int64) * worked // total
+
+
+def benchmark(n=1_000_000):
+    print("Benchmark of is_workday on {} dates".format(n))
+    print()
+
+    first_day = datetime.date(2000, 1, 1)
+    dates = [first_day + datetime.timedelta(days=i % 10_000) for i in range(n)]
+    calendar = BusinessCalendar(first_day, first_day + datetime.timedelta(days=11_000))
+
+    start = time.perf_counter()
+    scalar = [Employee.is_workday(day) for day in dates]
+    finish = time.perf_counter()
+    print(f"Employee.is_workday per date:    {round(finish-start, 3)} second(s)")
+
+    array = np.array(dates, dtype="datetime64[D]")
+    start = time.perf_counter()
+    vectorized = calendar.is_workday(array)
+    finish = time.perf_counter()
+    print(f"BusinessCalendar.is_workday:     {round(finish-start, 3)} second(s)")
+
+    ends = array + 365
+    start = time.perf_counter()
+    calendar.count_workdays(array[: n // 10], ends[: n // 10])
+    finish = time.perf_counter()
+    print(f"count_workdays for {n // 10} ranges: {round(finish-start, 3)} second(s)")
+
+    print("Same result: ", scalar == vectorized.tolist())
+    print()
+
+
+def main():
+    holidays = [datetime.date(2016, 7, 4)]
+    calendar = BusinessCalendar(datetime.date(2016, 1, 1), datetime.date(2016, 12, 31), holidays=holidays)
+
+    # 10th is a sunday, 11th is a monday, 4th is Independence Day
+    days = [datetime.date(2016, 7, 10), datetime.date(2016, 7, 11), datetime.date(2016, 7, 4)]
+    print(Employee.is_workday(days[0]))
+    print(Employee.is_workday(days[1]))
+    print(calendar.is_workday(days))
+    print()
+
+    print(calendar.next_workday(days))
+    print(calendar.count_workdays([datetime.date(2016, 7, 1)], [datetime.date(2016, 8, 1)]))
+    # np.busday_count gives the same answer
+    print(np.busday_count("2016-07-01", "2016-08-01", holidays=holidays))
+    print()
+
+    # Pay for July 2016, the second employee joined on the 18th
+    pays = [5000, 6000]
+    starts = [datetime.date(2015, 1, 1), datetime.date(2016, 7, 18)]
+    ends = [datetime.date(2017, 1, 1), datetime.date(2017, 1, 1)]
+    print(calendar.prorate(pays, starts, ends, datetime.date(2016, 7, 1), datetime.date(2016, 8, 1)))
+    print()
+
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+# Employee directory with hash indexes by email, last name and class, plus a sorted pay index
+
+import bisect
+import itertools
+import time
+
+
+class Employee(object):
+
+    raise_amount = 1.04
+
+    def __init__(self, first, last, pay):
+        # The directory that indexes this employee, it is told about every change
+        # to first, last and pay so that its indexes never go stale
+        self.directory = None
+        self._first = first
+        self._last = last
+        self._pay = pay
+
+    @property
+    def first(self):
+        return self._first
+
+    @first.setter
+    def first(self, first):
+        self._rename(first, self._last)
+
+    @property
+    def last(self):
+        return self._last
+
+    @last.setter
+    def last(self, last):
+        self._rename(self._first, last)
+
+    @property
+    def pay(self):
+        return self._pay
+
+    @pay.setter
+    def pay(self, pay):
+        old_pay = self._pay
+        self._pay = pay
+        if self.directory is not None:
+            self.directory._repay(self, old_pay)
+
+    @property
+    def email(self):
+        return "{}.{}@company.com".format(self.first, self.last)
+
+    @property
+    def fullname(self):
+        return "{} {}".format(self.first, self.last)
+
+    @fullname.setter
+    def fullname(self, name):
+        first, last = name.split(" ")
+        # Both names change together, so the directory re-indexes once
+        self._rename(first, last)
+
+    @fullname.deleter
+    def fullname(self):
+        self._rename(None, None)
+
+    @staticmethod
+    def _email_key(first, last):
+        # The email the directory indexes the employee by, None once the name is deleted:
+        # every deleted name would have the same email, None.None@company.com
+        if first is None and last is None:
+            return None
+        return "{}.{}@company.com".format(first, last)
+
+    def _rename(self, first, last):
+        old_email = self._email_key(self._first, self._last)
+        old_last = self._last
+        if self.directory is not None:
+            # Checked before anything is changed, a clash leaves the employee as it was
+            self.directory._check_email(self._email_key(first, last), self)
+        self._first = first
+        self._last = last
+        if self.directory is not None:
+            self.directory._rename(self, old_email, old_last)
+
+    def apply_raise(self):
+        self.pay = int(self.pay * self.raise_amount)
+
+
+class Developer(Employee):
+    raise_amount = 1.10
+
+    def __init__(self, first, last, pay, programming_language):
+        super().__init__(first, last, pay)
+        self.programming_language = programming_language
+
+
+class Manager(Employee):
+    def __init__(self, first, last, pay, employees=None):
+        super().__init__(first, last, pay)
+
+        if employees is None:
+            self.employees = []
+        else:
+            self.employees = employees
+
+
+# Most keys per bucket of the pay index, a full bucket is split in two
+BUCKET_SIZE = 2000
+
+
+class _SortedKeys(object):
+    # A sorted list cut into buckets of at most BUCKET_SIZE keys, with the last key of every bucket in maxes
+    # A plain sorted list shifts every key after the insert or delete point, O(n) for every pay change,
+    # here only one bucket is shifted and maxes (n / BUCKET_SIZE entries) when a bucket is split or emptied
+    # The keys have to be unique, (pay, seq) always is
+
+    def __init__(self, keys=()):
+        self._buckets = []
+        self._maxes = []
+        self._len = 0
+        self.rebuild(keys)
+
+    def rebuild(self, keys):
+        keys = sorted(keys)
+        half = BUCKET_SIZE // 2
+        self._buckets = [keys[i : i + half] for i in range(0, len(keys), half)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(keys)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._buckets)
+
+    def add(self, key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            return
+        # The first bucket whose last key is not smaller, or the last bucket for a new largest key
+        index = min(bisect.bisect_left(self._maxes, key), len(self._maxes) - 1)
+        bucket = self._buckets[index]
+        bisect.insort(bucket, key)
+        self._maxes[index] = bucket[-1]
+        self._len += 1
+        if len(bucket) > BUCKET_SIZE:
+            half = len(bucket) // 2
+            self._buckets.insert(index + 1, bucket[half:])
+            del bucket[half:]
+            self._maxes.insert(index, bucket[-1])
+
+    def remove(self, key):
+        index = bisect.bisect_left(self._maxes, key)
+        bucket = self._buckets[index]
+        del bucket[bisect.bisect_left(bucket, key)]
+        self._len -= 1
+        if bucket:
+            self._maxes[index] = bucket[-1]
+        else:
+            del self._buckets[index]
+            del self._maxes[index]
+
+    def between(self, low, high):
+        # The keys with low <= key <= high, in order
+        index = bisect.bisect_left(self._maxes, low)
+        if index == len(self._buckets):
+            return
+        bucket = self._buckets[index]
+        start = bisect.bisect_left(bucket, low)
+        for bucket in itertools.islice(self._buckets, index, None):
+            for key in itertools.islice(bucket, start, None):
+                if key > high:
+                    return
+                yield key
+            start = 0
+
+
+class EmployeeDirectory(object):
+    # Every lookup goes through an index instead of scanning the employees
+    # by_email, by_last and by_class are dictionaries, so they are O(1)
+    # pay_between uses bisect on sorted pay keys, so finding the range is O(log n),
+    # and a pay change updates one bucket of _SortedKeys instead of shifting a list of every employee
+    # The indexes are updated by the employees themselves when first, last or pay change
+
+    def __init__(self, employees=None):
+        self._by_email = {}
+        # last name -> {employee: None}, a dict is used as an insertion-ordered set
+        self._by_last = {}
+        # class -> {employee: None}
+        self._by_class = {}
+        # Sorted (pay, seq) keys, seq is a unique number per employee so that equal pays never
+        # compare the employees themselves, _by_seq maps it back to the employee
+        self._pay_keys = _SortedKeys()
+        self._by_seq = {}
+        self._seq_of = {}
+        self._counter = itertools.count()
+
+        if employees is not None:
+            self.extend(employees)
+
+    def __len__(self):
+        return len(self._seq_of)
+
+    def __contains__(self, emp):
+        return emp in self._seq_of
+
+    def __iter__(self):
+        return iter(self._seq_of)
+
+    def add(self, emp):
+        seq = self._index(emp)
+        self._pay_keys.add((emp.pay, seq))
+
+    def extend(self, employees):
+        # For a bulk load the new keys are sorted once together with the old ones
+        # instead of being inserted one at a time
+        new_keys = []
+        try:
+            for emp in employees:
+                new_keys.append((emp.pay, self._index(emp)))
+        finally:
+            # Employees indexed before a failing one stay in the directory with their pay keys
+            if new_keys:
+                self._pay_keys.rebuild(itertools.chain(self._pay_keys, new_keys))
+
+    def _index(self, emp):
+        if emp.directory is not None:
+            raise ValueError("{} is already in a directory".format(emp.fullname))
+        email = emp._email_key(emp.first, emp.last)
+        self._check_email(email, emp)
+
+        if email is not None:
+            self._by_email[email] = emp
+        self._by_last.setdefault(emp.last, {})[emp] = None
+        self._by_class.setdefault(type(emp), {})[emp] = None
+
+        seq = next(self._counter)
+        self._seq_of[emp] = seq
+        self._by_seq[seq] = emp
+
+        emp.directory = self
+        return seq
+
+    def remove(self, emp):
+        if emp.directory is not self:
+            raise KeyError(emp.fullname)
+
+        email = emp._email_key(emp.first, emp.last)
+        if email is not None:
+            del self._by_email[email]
+        self._discard(self._by_last, emp.last, emp)
+        self._discard(self._by_class, type(emp), emp)
+
+        seq = self._seq_of.pop(emp)
+        del self._by_seq[seq]
+        self._pay_keys.remove((emp.pay, seq))
+
+        emp.directory = None
+
+    def by_email(self, email):
+        # Returns None when nobody has this email
+        return self._by_email.get(email)
+
+    def by_last(self, last):
+        return list(self._by_last.get(last, ()))
+
+    def by_class(self, emp_cls):
+        # Exact class only, by_class(Employee) does not include Developers or Managers
+        return list(self._by_class.get(emp_cls, ()))
+
+    def pay_between(self, low, high):
+        # All employees with low <= pay <= high, from the lowest pay to the highest
+        keys = self._pay_keys.between((low,), (high, float("inf")))
+        return [self._by_seq[seq] for pay, seq in keys]
+
+    def _check_email(self, email, emp):
+        if email is None:
+            return
+        owner = self._by_email.get(email)
+        if owner is not None and owner is not emp:
+            raise ValueError("email {} is already used".format(email))
+
+    def _rename(self, emp, old_email, old_last):
+        if old_email is not None:
+            del self._by_email[old_email]
+        email = emp._email_key(emp.first, emp.last)
+        if email is not None:
+            self._by_email[email] = emp
+        if old_last != emp.last:
+            self._discard(self._by_last, old_last, emp)
+            self._by_last.setdefault(emp.last, {})[emp] = None
+
+    def _repay(self, emp, old_pay):
+        seq = self._seq_of[emp]
+        self._pay_keys.remove((old_pay, seq))
+        self._pay_keys.add((emp.pay, seq))
+
+    @staticmethod
+    def _discard(index, key, emp):
+        # Removes emp from one bucket and drops the bucket once it is empty
+        bucket = index[key]
+        del bucket[emp]
+        if not bucket:
+            del index[key]
+
+
+def benchmark(n=1_000_000, lookups=10_000):
+    print("Benchmark of {} lookups in a directory of {} employees".format(lookups, n))
+    print()
+
+    employees = [Employee("Test{}".format(i), "User{}".format(i % 1000), 50000 + i % 50000) for i in range(n)]
+
+    start = time.perf_counter()
+    directory = EmployeeDirectory(employees)
+    finish = time.perf_counter()
+    print(f"Building the directory: {round(finish-start, 2)} second(s)")
+
+    emails = ["Test{}.User{}@company.com".format(i, i % 1000) for i in range(0, n, n // lookups)]
+
+    # Scanning the objects, the only option without an index (only a few lookups, it is slow)
+    start = time.perf_counter()
+    for email in emails[-10:]:
+        for emp in employees:
+            if emp.email == email:
+                break
+    finish = time.perf_counter()
+    print(f"Scan, per lookup:       {round((finish-start) / 10 * 1e3, 1)} millisecond(s)")
+
+    start = time.perf_counter()
+    for email in emails:
+        directory.by_email(email)
+    finish = time.perf_counter()
+    print(f"Index, per lookup:      {round((finish-start) / len(emails) * 1e6, 3)} microsecond(s)")
+
+    start = time.perf_counter()
+    for i in range(lookups):
+        employees[i].fullname = "Renamed{} User{}".format(i, i % 7)
+    finish = time.perf_counter()
+    print(f"Rename, per employee:   {round((finish-start) / lookups * 1e6, 2)} microsecond(s)")
+
+    # Every pay change moves the employee in the pay index
+    start = time.perf_counter()
+    for emp in employees:
+        emp.apply_raise()
+    finish = time.perf_counter()
+    print(f"Raise for everybody:    {round(finish-start, 2)} second(s), {round((finish-start) / n * 1e6, 2)} microsecond(s) per employee")
+
+    start = time.perf_counter()
+    for i in range(lookups):
+        employees[i * (n // lookups)].pay = 50000 + i
+    finish = time.perf_counter()
+    print(f"Repay, per employee:    {round((finish-start) / lookups * 1e6, 2)} microsecond(s)")
+
+    start = time.perf_counter()
+    for i in range(lookups // 10):
+        directory.pay_between(60000 + i, 60010 + i)
+    finish = time.perf_counter()
+    print(f"pay_between, per call:  {round((finish-start) / (lookups // 10) * 1e6, 2)} microsecond(s)")
+    print()
+
+
+def main():
+    emp_1 = Employee("John", "Doe", 50000)
+    dev_1 = Developer("Steve", "Smith", 60000, "Python")
+    dev_2 = Developer("Jane", "Doe", 90000, "Java")
+    mgr_1 = Manager("Sue", "Smith", 90000, [dev_1, dev_2])
+
+    directory = EmployeeDirectory([emp_1, dev_1, dev_2, mgr_1])
+
+    print(directory.by_email("Steve.Smith@company.com").fullname)
+    print([emp.fullname for emp in directory.by_last("Doe")])
+    print([emp.fullname for emp in directory.by_class(Developer)])
+    print([emp.fullname for emp in directory.pay_between(55000, 90000)])
+    print()
+
+    # The fullname setter from tutorial_6 keeps the indexes up to date
+    dev_2.fullname = "Jane Smith"
+    print(directory.by_email("Jane.Doe@company.com"))
+    print(directory.by_email("Jane.Smith@company.com").fullname)
+    print([emp.fullname for emp in directory.by_last("Smith")])
+    print()
+
+    # So does a raise
+    emp_1.apply_raise()
+    print([emp.fullname for emp in directory.pay_between(51000, 60000)])
+    print()
+
+    try:
+        emp_1.fullname = "Sue Smith"
+    except ValueError as err:
+        print(err)
+    print(emp_1.fullname)
+    print()
+
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
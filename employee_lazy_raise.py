@@ -0,0 +1,197 @@
+# Lazy raises - a company-wide raise is recorded once and applied to each employee when its pay is read
+
+import time
+import weakref
+
+
+class Employee(object):
+
+    raise_amount = 1.04
+
+    # Every class in the hierarchy has its own raise log (see __init_subclass__)
+    # _raise_log holds the raise_amount of each raise recorded for this class, one entry per epoch
+    # _log_offset is the number of epochs that were trimmed from the front of the log by compact()
+    _raise_log = []
+    _log_offset = 0
+    _instances = weakref.WeakSet()
+
+    def __init_subclass__(cls, **kwargs):
+        # Without this, Developer would share Employee's log and Employee's raises
+        # would be applied with the wrong raise_amount
+        super().__init_subclass__(**kwargs)
+        cls._raise_log = []
+        cls._log_offset = 0
+        cls._instances = weakref.WeakSet()
+
+    def __init__(self, first, last, pay):
+        self.first = first
+        self.last = last
+        # _pay is the materialized pay, valid as of epoch _epoch
+        # Raises recorded before the employee was created do not apply to it
+        self._pay = pay
+        self._epoch = type(self)._current_epoch()
+        self.email = first + "." + last + "@company.com"
+        type(self)._instances.add(self)
+
+    @classmethod
+    def _current_epoch(cls):
+        return cls._log_offset + len(cls._raise_log)
+
+    @property
+    def pay(self):
+        # Applies every raise recorded since the last read, one at a time with the same truncation
+        # as apply_raise, then stores the result so the next read is a plain attribute lookup
+        cls = type(self)
+        start = self._epoch - cls._log_offset
+        if start < len(cls._raise_log):
+            pay = self._pay
+            for amount in cls._raise_log[start:]:
+                pay = int(pay * amount)
+            self._pay = pay
+            self._epoch = cls._current_epoch()
+        return self._pay
+
+    @pay.setter
+    def pay(self, pay):
+        # A new pay replaces any pending raises
+        self._pay = pay
+        self._epoch = type(self)._current_epoch()
+
+    def fullname(self):
+        return "{} {}".format(self.first, self.last)
+
+    def apply_raise(self):
+        # Eager raise for a single employee, same as before
+        self.pay = int(self.pay * self.raise_amount)
+
+    @classmethod
+    def set_raise_amount(cls, amount):
+        cls.raise_amount = amount
+
+    @classmethod
+    def record_raise(cls):
+        # Lazy raise for every instance of cls and of its subclasses
+        # Each class logs its own raise_amount as it is right now, so Developer still gets 10%
+        # and a later set_raise_amount does not change raises that were already recorded
+        # The cost depends on the number of classes, not on the number of employees
+        # Note: an instance level raise_amount (emp_1.raise_amount = 1.06) is not used by lazy raises
+        classes = [cls]
+        while classes:
+            emp_cls = classes.pop()
+            emp_cls._raise_log.append(emp_cls.raise_amount)
+            classes.extend(emp_cls.__subclasses__())
+
+    @classmethod
+    def compact(cls):
+        # Materializes the pay of every live instance of cls and its subclasses,
+        # after that nobody needs the old epochs anymore and the logs can be emptied
+        classes = [cls]
+        while classes:
+            emp_cls = classes.pop()
+            for emp in list(emp_cls._instances):
+                emp.pay
+            emp_cls._log_offset += len(emp_cls._raise_log)
+            emp_cls._raise_log = []
+            classes.extend(emp_cls.__subclasses__())
+
+
+class Developer(Employee):
+    raise_amount = 1.10
+
+    def __init__(self, first, last, pay, programming_language):
+        super().__init__(first, last, pay)
+        self.programming_language = programming_language
+
+
+class Manager(Employee):
+    def __init__(self, first, last, pay, employees=None):
+        super().__init__(first, last, pay)
+
+        if employees is None:
+            self.employees = []
+        else:
+            self.employees = employees
+
+
+# Plain Employee from tutorial_3 to compare against
+class EagerEmployee(object):
+
+    raise_amount = 1.04
+
+    def __init__(self, first, last, pay):
+        self.first = first
+        self.last = last
+        self.pay = pay
+
+    def apply_raise(self):
+        self.pay = int(self.pay * self.raise_amount)
+
+
+def benchmark(n=1_000_000, raises=10):
+    print("Benchmark of {} company-wide raises over {} employees".format(raises, n))
+    print()
+
+    eager = [EagerEmployee("Test", "User", 50000 + i) for i in range(n)]
+    lazy = [Employee("Test", "User", 50000 + i) for i in range(n)]
+
+    start = time.perf_counter()
+    for _ in range(raises):
+        for emp in eager:
+            emp.apply_raise()
+    finish = time.perf_counter()
+    print(f"Eager apply_raise:     {round(finish-start, 3)} second(s)")
+
+    start = time.perf_counter()
+    for _ in range(raises):
+        Employee.record_raise()
+    finish = time.perf_counter()
+    print(f"Lazy record_raise:     {round((finish-start) * 1e6, 1)} microsecond(s)")
+
+    # The work is done on the first read of each pay instead
+    start = time.perf_counter()
+    pays = [emp.pay for emp in lazy]
+    finish = time.perf_counter()
+    print(f"First read of all pay: {round(finish-start, 3)} second(s)")
+
+    start = time.perf_counter()
+    Employee.compact()
+    finish = time.perf_counter()
+    print(f"compact():             {round(finish-start, 3)} second(s)")
+
+    print("Same result: ", pays == [emp.pay for emp in eager])
+    print()
+
+
+def main():
+    emp_1 = Employee("John", "Doe", 50000)
+    dev_1 = Developer("Steve", "Smith", 60000, "Python")
+    mgr_1 = Manager("Sue", "Smith", 90000, [emp_1, dev_1])
+
+    # Two raises for everyone, nothing is computed yet
+    Employee.record_raise()
+    Employee.set_raise_amount(1.05)
+    Employee.record_raise()
+    print(Employee._raise_log, Developer._raise_log, Manager._raise_log)
+
+    # The pay is brought up to date when it is read
+    print(emp_1.pay)
+    print(dev_1.pay)
+    print(mgr_1.pay)
+    print()
+
+    # A raise only for Developers
+    Developer.record_raise()
+    print(dev_1.pay)
+
+    # Materialize everyone and trim the logs
+    Employee.compact()
+    print(Employee._raise_log, Developer._raise_log, Manager._raise_log)
+    print(emp_1.pay, dev_1.pay, mgr_1.pay)
+    print()
+
+    Employee.set_raise_amount(1.04)
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
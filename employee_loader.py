@@ -0,0 +1,185 @@
+# Streaming bulk loader for "first-last-pay" employee records
+
+import concurrent.futures
+import itertools
+import os
+import tempfile
+import time
+
+
+def parse_record(emp_str):
+    # Same split as from_string in tutorial_3, but pay is converted to an int
+    # so that apply_raise multiplies a number and not a string
+    fname, lname, emp_pay = emp_str.split("-")
+    return fname, lname, int(emp_pay)
+
+
+def parse_chunk(first_line_number, lines):
+    # Parses a whole chunk in one call, this is the function sent to the worker processes
+    # It has to be defined at module level so that it can be pickled (see tutorial_9)
+    # Only plain tuples are returned, they are much cheaper to pickle than Employee objects
+    records = []
+    errors = []
+    for line_number, line in enumerate(lines, first_line_number):
+        line = line.strip()
+        if not line:
+            # Blank lines are skipped, they are not errors
+            continue
+        try:
+            records.append(parse_record(line))
+        except ValueError as err:
+            # A wrong number of "-" or a pay that is not a number, report it and keep going
+            errors.append((line_number, line, str(err)))
+    return records, errors
+
+
+def read_chunks(lines, chunk_size):
+    # Cuts any iterable of lines into lists of chunk_size lines
+    # Only one chunk is held at a time, so a huge file is never read into memory at once
+    lines = iter(lines)
+    line_number = 1
+    while True:
+        chunk = list(itertools.islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield line_number, chunk
+        line_number += len(chunk)
+
+
+class Employee(object):
+
+    num_of_emps = 0
+    raise_amount = 1.04
+
+    def __init__(self, first, last, pay):
+        self.first = first
+        self.last = last
+        self.pay = pay
+        self.email = first + "." + last + "@company.com"
+
+        Employee.num_of_emps += 1
+
+    def fullname(self):
+        return "{} {}".format(self.first, self.last)
+
+    def apply_raise(self):
+        self.pay = int(self.pay * self.raise_amount)
+
+    @classmethod
+    def set_raise_amount(cls, amount):
+        cls.raise_amount = amount
+
+    @classmethod
+    def from_string(cls, emp_str):
+        fname, lname, emp_pay = emp_str.split("-")
+        return cls(fname, lname, emp_pay)
+
+    @classmethod
+    def from_lines(cls, lines, errors=None, chunk_size=10_000, processes=None):
+        # Bulk alternative constructor, it is a generator so employees are created as the lines are read
+        # Malformed lines do not stop the loader, they are appended to errors
+        # as (line_number, line, reason) when an errors list is given
+        # processes=None parses in this process, any other number fans the chunks out to a process pool
+        if processes is None:
+            results = (parse_chunk(start, chunk) for start, chunk in read_chunks(lines, chunk_size))
+        else:
+            results = cls._parse_in_pool(lines, chunk_size, processes)
+
+        for records, chunk_errors in results:
+            if errors is not None:
+                errors.extend(chunk_errors)
+            for fname, lname, emp_pay in records:
+                yield cls(fname, lname, emp_pay)
+
+    @classmethod
+    def from_file(cls, filename, errors=None, chunk_size=10_000, processes=None):
+        with open(filename, "r") as f:
+            yield from cls.from_lines(f, errors=errors, chunk_size=chunk_size, processes=processes)
+
+    @staticmethod
+    def _parse_in_pool(lines, chunk_size, processes):
+        # executor.map would read every chunk of the file up front (see tutorial_9 example_8)
+        # Instead only a few chunks per process are in flight, a new chunk is read
+        # only when the oldest one is done, which keeps the memory bounded
+        max_in_flight = processes * 2
+        chunks = read_chunks(lines, chunk_size)
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+            in_flight = []
+            for start, chunk in itertools.islice(chunks, max_in_flight):
+                in_flight.append(executor.submit(parse_chunk, start, chunk))
+
+            while in_flight:
+                # Results are taken in file order, so employees come out in the same order as the lines
+                future = in_flight.pop(0)
+                for start, chunk in itertools.islice(chunks, 1):
+                    in_flight.append(executor.submit(parse_chunk, start, chunk))
+                yield future.result()
+
+    @staticmethod
+    def is_workday(day):
+        if day.weekday() == 5 or day.weekday() == 6:
+            return False
+        return True
+
+
+def write_sample_file(filename, n):
+    with open(filename, "w") as f:
+        for i in range(n):
+            f.write("Test{}-User{}-{}\n".format(i, i, 50000 + i))
+            if i % 100_000 == 0:
+                # Throw in a few broken records
+                f.write("Broken-Line\n")
+
+
+def benchmark(n=1_000_000):
+    print("Benchmark of loading {} records".format(n))
+    print()
+
+    filename = os.path.join(tempfile.gettempdir(), "employees.txt")
+    write_sample_file(filename, n)
+
+    # from_string stops at the first broken record, so the lines are filtered first
+    start = time.perf_counter()
+    with open(filename, "r") as f:
+        employees = [Employee.from_string(line.strip()) for line in f if line.count("-") == 2]
+    finish = time.perf_counter()
+    print(f"from_string per line:   {round(finish-start, 2)} second(s)")
+
+    for processes in (None, os.cpu_count()):
+        errors = []
+        start = time.perf_counter()
+        count = 0
+        for emp in Employee.from_file(filename, errors=errors, processes=processes):
+            count += 1
+        finish = time.perf_counter()
+        print(
+            f"from_file processes={processes}: {round(finish-start, 2)} second(s), "
+            f"{count} employees, {len(errors)} errors"
+        )
+
+    os.remove(filename)
+    print()
+
+
+def main():
+    lines = ["John-Doe-70000", "Steve-Smith-30000", "Broken-Line", "Jane-Doe-abc", "", "Jane-Doe-90000"]
+
+    errors = []
+    for emp in Employee.from_lines(lines, errors=errors):
+        print(emp.email)
+        # pay is now an int, so apply_raise works
+        emp.apply_raise()
+        print(emp.pay)
+    print()
+
+    for line_number, line, reason in errors:
+        print("line {}: {!r} - {}".format(line_number, line, reason))
+    print()
+
+    benchmark()
+
+
+# Needed because from_file can start worker processes (see tutorial_9)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# Manager reports with O(1) membership checks and an org tree with incrementally maintained totals
+
+import time
+
+
+class Employee(object):
+
+    raise_amount = 1.04
+
+    def __init__(self, first, last, pay):
+        # manager has to exist before pay is set, the pay setter uses it
+        self.manager = None
+        self.first = first
+        self.last = last
+        self.pay = pay
+        self.email = first + "." + last + "@company.com"
+
+    @property
+    def pay(self):
+        return self._pay
+
+    @pay.setter
+    def pay(self, pay):
+        # Every manager above this employee keeps the total pay of its whole subtree
+        # Instead of recomputing the totals, only the difference is passed up the chain of managers
+        delta = pay - getattr(self, "_pay", 0)
+        self._pay = pay
+
+        manager = self.manager
+        while manager is not None:
+            manager.total_pay += delta
+            manager = manager.manager
+
+    def fullname(self):
+        return "{} {}".format(self.first, self.last)
+
+    def apply_raise(self):
+        self.pay = int(self.pay * self.raise_amount)
+
+
+class Developer(Employee):
+    raise_amount = 1.10
+
+    def __init__(self, first, last, pay, programming_language):
+        super().__init__(first, last, pay)
+        self.programming_language = programming_language
+
+
+class Manager(Employee):
+    def __init__(self, first, last, pay, employees=None):
+        # The aggregates have to exist before the pay setter in Employee.__init__ runs
+        # total_pay is the pay of all transitive reports, the manager's own pay is not included
+        self.total_pay = 0
+        # Direct reports, a dict is used as an insertion-ordered set (the values are always None)
+        # "emp in self.employees" is a hash lookup instead of a scan through a list
+        self.employees = {}
+        # Every employee below this manager, direct or not
+        self._all_reports = {}
+
+        super().__init__(first, last, pay)
+
+        if employees is not None:
+            for emp in employees:
+                self.add_emp(emp)
+
+    @property
+    def headcount(self):
+        return len(self._all_reports)
+
+    @property
+    def all_reports(self):
+        # A read-only view, nothing is copied and nothing is walked
+        return self._all_reports.keys()
+
+    @property
+    def subtree_pay(self):
+        return self.pay + self.total_pay
+
+    def add_emp(self, emp):
+        if emp in self.employees:
+            return
+
+        # A manager cannot report to itself or to someone below it
+        if emp is self or (isinstance(emp, Manager) and self in emp._all_reports):
+            raise ValueError("{} cannot report to {}".format(emp.fullname(), self.fullname()))
+
+        # An employee only has one manager, moving someone removes them from the old team first
+        if emp.manager is not None:
+            emp.manager.remove_emp(emp)
+
+        self.employees[emp] = None
+        emp.manager = self
+        self._update_ancestors(emp, adding=True)
+
+    def remove_emp(self, emp):
+        if emp in self.employees:
+            self._update_ancestors(emp, adding=False)
+            del self.employees[emp]
+            emp.manager = None
+
+    def _update_ancestors(self, emp, adding):
+        # The employee brings (or takes away) its whole subtree
+        # Only the managers from here up to the top are touched, the rest of the tree is not visited
+        moved = [emp]
+        pay = emp.pay
+        if isinstance(emp, Manager):
+            moved.extend(emp._all_reports)
+            pay += emp.total_pay
+
+        manager = self
+        while manager is not None:
+            if adding:
+                manager._all_reports.update(dict.fromkeys(moved))
+                manager.total_pay += pay
+            else:
+                for report in moved:
+                    del manager._all_reports[report]
+                manager.total_pay -= pay
+            manager = manager.manager
+
+    def print_emp(self):
+        for emp in self.employees:
+            print("--> ", emp.fullname())
+
+
+# Manager from tutorial_4, kept to compare against
+class ListManager(Employee):
+    def __init__(self, first, last, pay, employees=None):
+        super().__init__(first, last, pay)
+
+        if employees is None:
+            self.employees = []
+        else:
+            self.employees = employees
+
+    def add_emp(self, emp):
+        if emp not in self.employees:
+            self.employees.append(emp)
+
+    def remove_emp(self, emp):
+        if emp in self.employees:
+            self.employees.remove(emp)
+
+
+def benchmark(n=20_000):
+    print("Benchmark of building a team of {} employees".format(n))
+    print()
+
+    for manager_cls in (ListManager, Manager):
+        employees = [Employee("Test", "User{}".format(i), 50000) for i in range(n)]
+        mgr = manager_cls("Sue", "Smith", 90000)
+
+        start = time.perf_counter()
+        for emp in employees:
+            mgr.add_emp(emp)
+        for emp in employees[::2]:
+            mgr.remove_emp(emp)
+        finish = time.perf_counter()
+
+        print(f"{manager_cls.__name__:<12} {round(finish-start, 3)} second(s)")
+    print()
+
+
+def main():
+    dev_1 = Employee("John", "Doe", 50000)
+    dev_2 = Developer("Steve", "Smith", 60000, "Python")
+    dev_3 = Developer("Jane", "Doe", 90000, "Java")
+
+    mgr_1 = Manager("Sue", "Smith", 90000, [dev_1])
+    mgr_1.add_emp(dev_2)
+    mgr_1.add_emp(dev_3)
+    mgr_1.print_emp()
+    print()
+
+    # A manager of managers
+    director = Manager("Corey", "Schafer", 150000, [mgr_1])
+    print("headcount: ", director.headcount)
+    print("total_pay: ", director.total_pay)
+    print([emp.fullname() for emp in director.all_reports])
+    print()
+
+    # A raise deep in the tree updates every total above it
+    dev_2.apply_raise()
+    print("total_pay after raise: ", director.total_pay)
+
+    mgr_1.remove_emp(dev_1)
+    print("headcount after remove: ", director.headcount)
+    print("total_pay after remove: ", director.total_pay)
+    print()
+
+    try:
+        mgr_1.add_emp(director)
+    except ValueError as err:
+        print(err)
+    print()
+
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+# Payroll aggregation - totals, mean, min, max and percentiles of pay, optionally grouped
+
+import math
+import time
+
+import numpy as np
+
+from employee_table import EmployeeTable
+
+
+# Employee from tutorial_5, with __radd__ so that emp_1 + emp_2 + emp_3 and sum() work
+class Employee(object):
+
+    raise_amount = 1.04
+
+    def __init__(self, first, last, pay):
+        self.first = first
+        self.last = last
+        self.pay = pay
+        self.email = first + "." + last + "@company.com"
+
+    def fullname(self):
+        return "{} {}".format(self.first, self.last)
+
+    def apply_raise(self):
+        self.pay = int(self.pay * self.raise_amount)
+
+    def __repr__(self):
+        return "Employee('{}', '{}', '{}')".format(self.first, self.last, self.pay)
+
+    def __str__(self):
+        return "{} - {}".format(self.fullname(), self.email)
+
+    def __add__(self, other):
+        return self.pay + other.pay
+
+    # emp_1 + emp_2 returns an int, then int + emp_3 is not supported by int,
+    # so Python tries the reflected method emp_3.__radd__(int)
+    # sum() starts from 0, so 0 + emp_1 goes through here as well
+    def __radd__(self, other):
+        return other + self.pay
+
+    def __len__(self):
+        return len(self.fullname())
+
+
+class Developer(Employee):
+    raise_amount = 1.10
+
+    def __init__(self, first, last, pay, programming_language):
+        super().__init__(first, last, pay)
+        self.programming_language = programming_language
+
+
+class Manager(Employee):
+    def __init__(self, first, last, pay, employees=None):
+        super().__init__(first, last, pay)
+
+        if employees is None:
+            self.employees = []
+        else:
+            self.employees = employees
+
+
+class PayrollSummary(object):
+    def __init__(self, count, total, mean, minimum, maximum, percentiles):
+        self.count = count
+        self.total = total
+        self.mean = mean
+        self.min = minimum
+        self.max = maximum
+        # {percentile: value}, for example {50: 60000.0, 90: 88000.0}
+        self.percentiles = percentiles
+
+    def __repr__(self):
+        return "PayrollSummary(count={}, total={}, mean={}, min={}, max={}, percentiles={})".format(
+            self.count, self.total, self.mean, self.min, self.max, self.percentiles
+        )
+
+
+# Above this many employees the pay values are put in a NumPy array and aggregated there
+VECTORIZE_ABOVE = 10_000
+# Up to this many groups every group is selected with a mask, above it the pay column is sorted by group
+MASK_GROUPS_UP_TO = 16
+
+
+def payroll(employees, group_by=None, percentiles=(50, 90, 99), vectorize_above=VECTORIZE_ABOVE):
+    # Aggregates the pay of employees, which can be any iterable of Employee objects or an EmployeeTable
+    # group_by can be:
+    #   None       - one PayrollSummary for everyone
+    #   "class"    - {Employee: summary, Developer: summary, ...}
+    #   "manager"  - {manager: summary}, from the employees lists of the Managers found in employees
+    #                employees without a manager are grouped under None
+    #   a function - {function(emp): summary}
+    if isinstance(employees, EmployeeTable):
+        return _payroll_table(employees, group_by, percentiles)
+
+    employees = list(employees)
+    keys = _group_keys(employees, group_by)
+
+    if len(employees) > vectorize_above:
+        pays = np.fromiter((emp.pay for emp in employees), dtype=np.int64, count=len(employees))
+        if keys is None:
+            return _summarize_array(pays, percentiles)
+        return _summarize_groups(pays, keys, percentiles)
+
+    if keys is None:
+        return _summarize_list([emp.pay for emp in employees], percentiles)
+
+    groups = {}
+    for key, emp in zip(keys, employees):
+        groups.setdefault(key, []).append(emp.pay)
+    return {key: _summarize_list(pays, percentiles) for key, pays in groups.items()}
+
+
+def _group_keys(employees, group_by):
+    if group_by is None:
+        return None
+    if group_by == "class":
+        return [type(emp) for emp in employees]
+    if group_by == "manager":
+        manager_of = {}
+        for emp in employees:
+            if isinstance(emp, Manager):
+                for report in emp.employees:
+                    manager_of[report] = emp
+        return [manager_of.get(emp) for emp in employees]
+    if callable(group_by):
+        return [group_by(emp) for emp in employees]
+    raise ValueError("group_by must be None, 'class', 'manager' or a function, not {!r}".format(group_by))
+
+
+def _summarize_list(pays, percentiles):
+    # Pure Python path for small inputs, count, total, min and max in a single loop
+    count = 0
+    total = 0
+    minimum = maximum = None
+    for pay in pays:
+        count += 1
+        total += pay
+        if minimum is None or pay < minimum:
+            minimum = pay
+        if maximum is None or pay > maximum:
+            maximum = pay
+
+    if count == 0:
+        return PayrollSummary(0, 0, None, None, None, {p: None for p in percentiles})
+
+    ordered = sorted(pays)
+    return PayrollSummary(
+        count,
+        total,
+        total / count,
+        minimum,
+        maximum,
+        {p: _percentile(ordered, p) for p in percentiles},
+    )
+
+
+def _percentile(ordered, p):
+    # Linear interpolation between the closest ranks, the same method as np.percentile uses by default
+    position = (len(ordered) - 1) * p / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    fraction = position - lower
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * fraction
+
+
+def _summarize_array(pays, percentiles):
+    if len(pays) == 0:
+        return PayrollSummary(0, 0, None, None, None, {p: None for p in percentiles})
+
+    total = int(pays.sum())
+    values = np.percentile(pays, list(percentiles))
+    return PayrollSummary(
+        len(pays),
+        total,
+        total / len(pays),
+        int(pays.min()),
+        int(pays.max()),
+        {p: float(value) for p, value in zip(percentiles, values)},
+    )
+
+
+def _summarize_groups(pays, keys, percentiles):
+    # Turn the keys into group numbers 0, 1, 2, ... in order of first appearance
+    codes_by_key = {}
+    codes = np.fromiter(
+        (codes_by_key.setdefault(key, len(codes_by_key)) for key in keys), dtype=np.int64, count=len(keys)
+    )
+    return _summarize_codes(pays, codes, list(codes_by_key), percentiles)
+
+
+def _summarize_codes(pays, codes, groups, percentiles):
+    result = {}
+
+    if len(groups) <= MASK_GROUPS_UP_TO:
+        # With a handful of groups (the classes) one boolean mask per group
+        # is cheaper than sorting the whole pay column
+        for code, key in enumerate(groups):
+            group_pays = pays[codes == code]
+            if len(group_pays):
+                result[key] = _summarize_array(group_pays, percentiles)
+        return result
+
+    # With many groups (one per manager) sort once so that every group is a contiguous slice
+    order = np.argsort(codes, kind="stable")
+    sorted_pays = pays[order]
+    bounds = np.searchsorted(codes[order], np.arange(len(groups) + 1))
+    for code, key in enumerate(groups):
+        group_pays = sorted_pays[bounds[code] : bounds[code + 1]]
+        if len(group_pays):
+            result[key] = _summarize_array(group_pays, percentiles)
+    return result
+
+
+def _payroll_table(table, group_by, percentiles):
+    # The pay column is already an array, nothing has to be collected from objects
+    if group_by is None:
+        return _summarize_array(table.pay, percentiles)
+    if group_by == "class":
+        return _summarize_codes(table.pay, table.class_code.astype(np.int64), table.classes, percentiles)
+    raise ValueError("an EmployeeTable can only be grouped by None or 'class', not {!r}".format(group_by))
+
+
+def benchmark(n=1_000_000):
+    print("Benchmark of payroll over {} employees".format(n))
+    print()
+
+    employees = []
+    for i in range(n):
+        if i % 2:
+            employees.append(Developer("Test", "User", 50000 + i % 70000, "Python"))
+        else:
+            employees.append(Employee("Test", "User", 50000 + i % 90000))
+
+    start = time.perf_counter()
+    total = 0
+    for emp in employees:
+        total = total + emp.pay
+    finish = time.perf_counter()
+    print(f"Hand-written loop (total only):  {round(finish-start, 3)} second(s)")
+
+    start = time.perf_counter()
+    total_sum = sum(employees)
+    finish = time.perf_counter()
+    print(f"sum(employees) (total only):     {round(finish-start, 3)} second(s)")
+
+    for vectorize_above in (n, 0):
+        start = time.perf_counter()
+        summary = payroll(employees, group_by="class", vectorize_above=vectorize_above)
+        finish = time.perf_counter()
+        label = "payroll by class ({}):".format("pure Python" if vectorize_above else "NumPy")
+        print(f"{label:<33}{round(finish-start, 3)} second(s)")
+
+    start = time.perf_counter()
+    table = EmployeeTable.from_employees(employees)
+    finish = time.perf_counter()
+    print(f"Building an EmployeeTable:       {round(finish-start, 3)} second(s)")
+
+    start = time.perf_counter()
+    payroll(table, group_by="class")
+    finish = time.perf_counter()
+    print(f"payroll by class on the table:   {round(finish-start, 3)} second(s)")
+
+    print("Same total: ", total == total_sum == payroll(employees).total == payroll(table).total)
+    print()
+
+
+def main():
+    emp_1 = Employee("John", "Doe", 50000)
+    emp_2 = Developer("Steve", "Smith", 60000, "Python")
+    emp_3 = Developer("Jane", "Doe", 90000, "Java")
+    mgr_1 = Manager("Sue", "Smith", 120000, [emp_2, emp_3])
+
+    # Pairwise __add__ from tutorial_5, and now chained and with sum()
+    print(emp_1 + emp_2)
+    print(emp_1 + emp_2 + emp_3)
+    print(sum([emp_1, emp_2, emp_3]))
+    print()
+
+    employees = [emp_1, emp_2, emp_3, mgr_1]
+    print(payroll(employees))
+    print()
+
+    for emp_cls, summary in payroll(employees, group_by="class").items():
+        print(emp_cls.__name__, summary)
+    print()
+
+    for manager, summary in payroll(employees, group_by="manager").items():
+        name = manager.fullname() if manager is not None else "No manager"
+        print(name, summary)
+    print()
+
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
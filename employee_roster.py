@@ -0,0 +1,312 @@
+# Binary roster file - employees stored as fixed-width columns and read back through mmap without copying
+
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from employee_table import Developer, Employee, EmployeeTable, Manager
+
+# File layout, all numbers are little-endian and every section starts on an 8 byte boundary
+#
+#   header           see HEADER below
+#   first            uint32 per row, index of the first name in the string table
+#   last             uint32 per row, index of the last name in the string table
+#   pay              int64 per row
+#   class_code       uint16 per row, index into the class names
+#   class names      uint32 per class, index of the class name in the string table
+#   string index     uint64 per string + 1, string i is data[index[i]:index[i + 1]]
+#   string data      utf-8 bytes of every distinct string, one after the other
+#
+# A name used by many employees ("John") is stored once in the string table
+
+MAGIC = b"EMPR"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQII7Q")
+
+FIRST_DTYPE = np.dtype("<u4")
+LAST_DTYPE = np.dtype("<u4")
+PAY_DTYPE = np.dtype("<i8")
+CLASS_DTYPE = np.dtype("<u2")
+STRING_ID_DTYPE = np.dtype("<u4")
+STRING_INDEX_DTYPE = np.dtype("<u8")
+
+
+def _align(offset):
+    return (offset + 7) // 8 * 8
+
+
+def write_roster(filename, employees):
+    # employees can be a list of Employee objects or an EmployeeTable
+    if not isinstance(employees, EmployeeTable):
+        employees = EmployeeTable.from_employees(employees)
+    table = employees
+
+    strings = {}
+
+    def string_id(value):
+        return strings.setdefault(value, len(strings))
+
+    rows = len(table)
+    first = np.fromiter((string_id(name) for name in table.first), dtype=FIRST_DTYPE, count=rows)
+    last = np.fromiter((string_id(name) for name in table.last), dtype=LAST_DTYPE, count=rows)
+    pay = table.pay.astype(PAY_DTYPE)
+    class_code = table.class_code.astype(CLASS_DTYPE)
+    class_names = np.array([string_id(emp_cls.__name__) for emp_cls in table.classes], dtype=STRING_ID_DTYPE)
+
+    encoded = [value.encode("utf-8") for value in strings]
+    string_index = np.zeros(len(encoded) + 1, dtype=STRING_INDEX_DTYPE)
+    np.cumsum([len(value) for value in encoded], out=string_index[1:])
+    string_data = b"".join(encoded)
+
+    sections = [first, last, pay, class_code, class_names, string_index, string_data]
+    offsets = []
+    offset = HEADER.size
+    for section in sections:
+        offset = _align(offset)
+        offsets.append(offset)
+        offset += section.nbytes if isinstance(section, np.ndarray) else len(section)
+
+    header = HEADER.pack(MAGIC, VERSION, 0, rows, len(table.classes), len(encoded), *offsets)
+    with open(filename, "wb") as f:
+        f.write(header)
+        for section, offset in zip(sections, offsets):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(section.tobytes() if isinstance(section, np.ndarray) else section)
+
+
+class RosterRecord(object):
+    # A view of one row, nothing is read from the file until an attribute is accessed
+    __slots__ = ("_roster", "_row")
+
+    def __init__(self, roster, row):
+        self._roster = roster
+        self._row = row
+
+    @property
+    def first(self):
+        return self._roster._string(self._roster.first[self._row])
+
+    @property
+    def last(self):
+        return self._roster._string(self._roster.last[self._row])
+
+    @property
+    def pay(self):
+        return int(self._roster.pay[self._row])
+
+    @property
+    def class_name(self):
+        return self._roster.class_names[self._roster.class_code[self._row]]
+
+    @property
+    def email(self):
+        return self.first + "." + self.last + "@company.com"
+
+    def fullname(self):
+        return "{} {}".format(self.first, self.last)
+
+    def to_employee(self, classes=None):
+        # Builds a real object for this row
+        # Only first, last and pay are in the file, so Developer.programming_language
+        # and Manager.employees are not restored, they get the defaults None and []
+        classes = classes or DEFAULT_CLASSES
+        emp_cls = classes[self.class_name]
+        emp = emp_cls.__new__(emp_cls)
+        Employee.__init__(emp, self.first, self.last, self.pay)
+        if isinstance(emp, Developer):
+            emp.programming_language = None
+        if isinstance(emp, Manager):
+            emp.employees = []
+        return emp
+
+    def __repr__(self):
+        return "{}('{}', '{}', '{}')".format(self.class_name, self.first, self.last, self.pay)
+
+
+DEFAULT_CLASSES = {"Employee": Employee, "Developer": Developer, "Manager": Manager}
+
+
+class Roster(object):
+    # Opens a roster file with mmap, the operating system only reads the pages that are touched
+    # The columns are NumPy arrays pointing straight into the mapped file (no copy),
+    # so opening a 10 million row file costs the same as opening a 10 row file
+
+    def __init__(self, filename):
+        self._file = open(filename, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            # An empty file cannot be mapped
+            self._file.close()
+            raise
+
+        try:
+            self._read_header(filename)
+        except BaseException:
+            # A bad or truncated file, nothing is left open (the views have to go first, see close)
+            self.first = self.last = self.pay = self.class_code = self._string_index = None
+            self._map.close()
+            self._file.close()
+            raise
+
+    def _read_header(self, filename):
+        magic, version, _, rows, class_count, string_count, *offsets = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError("{} is not a roster file".format(filename))
+        if version != VERSION:
+            raise ValueError("unsupported roster version {}".format(version))
+
+        self._rows, self._string_count = rows, string_count
+        self._offsets = offsets
+        self._data_offset = offsets[-1]
+        self._map_columns()
+
+        names_offset = offsets[4]
+        # A list and not an array, so no view of the map is left in this frame if _string raises
+        class_ids = np.frombuffer(self._map, dtype=STRING_ID_DTYPE, count=class_count, offset=names_offset).tolist()
+        self.class_names = [self._string(string_id) for string_id in class_ids]
+
+    def _map_columns(self):
+        # The column arrays, views into the map
+        rows = self._rows
+        first_offset, last_offset, pay_offset, class_offset, _, index_offset, _ = self._offsets
+        self.first = np.frombuffer(self._map, dtype=FIRST_DTYPE, count=rows, offset=first_offset)
+        self.last = np.frombuffer(self._map, dtype=LAST_DTYPE, count=rows, offset=last_offset)
+        self.pay = np.frombuffer(self._map, dtype=PAY_DTYPE, count=rows, offset=pay_offset)
+        self.class_code = np.frombuffer(self._map, dtype=CLASS_DTYPE, count=rows, offset=class_offset)
+        self._string_index = np.frombuffer(
+            self._map, dtype=STRING_INDEX_DTYPE, count=self._string_count + 1, offset=index_offset
+        )
+
+    def _string(self, string_id):
+        start = self._data_offset + int(self._string_index[string_id])
+        end = self._data_offset + int(self._string_index[string_id + 1])
+        return self._map[start:end].decode("utf-8")
+
+    def __len__(self):
+        return len(self.pay)
+
+    def __getitem__(self, row):
+        # O(1) random access, every column has a fixed width
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("roster row out of range")
+        return RosterRecord(self, row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield RosterRecord(self, row)
+
+    def to_table(self, classes=None):
+        # Copies the roster into an EmployeeTable (this one does read every row)
+        classes = classes or DEFAULT_CLASSES
+        strings = [self._string(string_id) for string_id in range(len(self._string_index) - 1)]
+        strings = np.array(strings, dtype=object)
+        return EmployeeTable(
+            strings[self.first],
+            strings[self.last],
+            # Copies, EmployeeTable would otherwise keep views into the map and close() would fail
+            self.pay.copy(),
+            self.class_code.copy(),
+            [classes[name] for name in self.class_names],
+        )
+
+    def close(self):
+        # The NumPy views have to be dropped before the map can be closed,
+        # mmap refuses to close (BufferError) while other arrays still point into it
+        # If the caller still holds one, the views are made again so the roster stays usable
+        self.first = self.last = self.pay = self.class_code = self._string_index = None
+        try:
+            self._map.close()
+        except BufferError:
+            self._map_columns()
+            raise
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def benchmark(n=10_000_000):
+    print("Benchmark of a roster of {} employees".format(n))
+    print()
+
+    filename = os.path.join(tempfile.gettempdir(), "roster.bin")
+
+    names = np.array(["Test{}".format(i) for i in range(1000)], dtype=object)
+    rows = np.arange(n)
+    table = EmployeeTable(
+        names[rows % 1000], names[rows % 997], 50000 + rows % 90000, rows % 3, [Employee, Developer, Manager]
+    )
+
+    start = time.perf_counter()
+    write_roster(filename, table)
+    finish = time.perf_counter()
+    print(f"write_roster:            {round(finish-start, 2)} second(s), {os.path.getsize(filename) // 2**20} MiB")
+
+    start = time.perf_counter()
+    roster = Roster(filename)
+    finish = time.perf_counter()
+    print(f"Roster open:             {round((finish-start) * 1e3, 3)} millisecond(s)")
+
+    start = time.perf_counter()
+    for row in range(0, n, n // 10_000):
+        roster[row].fullname()
+    finish = time.perf_counter()
+    print(f"Random row access:       {round((finish-start) / 10_000 * 1e6, 2)} microsecond(s) per row")
+
+    start = time.perf_counter()
+    total = int(roster.pay.sum())
+    finish = time.perf_counter()
+    print(f"Total pay from the map:  {round(finish-start, 3)} second(s)")
+
+    # Loading the same employees back from their repr (tutorial_5), only for a small part of them
+    reprs = [
+        "Employee('{}', '{}', {})".format(names[i % 1000], names[i % 997], 50000 + i % 90000) for i in range(100_000)
+    ]
+    start = time.perf_counter()
+    for text in reprs:
+        eval(text)
+    finish = time.perf_counter()
+    print(f"eval(repr) for 100000:   {round(finish-start, 2)} second(s)")
+
+    print("Same total: ", total == int(table.pay.sum()))
+    roster.close()
+    os.remove(filename)
+    print()
+
+
+def main():
+    emp_1 = Employee("John", "Doe", 50000)
+    dev_1 = Developer("Steve", "Smith", 60000, "Python")
+    mgr_1 = Manager("Sue", "Smith", 90000, [emp_1, dev_1])
+
+    filename = os.path.join(tempfile.gettempdir(), "roster.bin")
+    write_roster(filename, [emp_1, dev_1, mgr_1])
+
+    with Roster(filename) as roster:
+        print(len(roster))
+        print(roster[1])
+        print(roster[-1].email)
+        print(roster.pay)
+
+        emp = roster[1].to_employee()
+        emp.apply_raise()
+        print(type(emp).__name__, emp.fullname(), emp.pay)
+        del emp
+    os.remove(filename)
+    print()
+
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
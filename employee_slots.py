@@ -0,0 +1,198 @@
+# Compact Employee objects using __slots__ instead of a per-instance __dict__
+
+import time
+import tracemalloc
+
+
+# Regular classes, every instance carries its own __dict__ (see tutorial_2: print(emp_1.__dict__))
+class Employee(object):
+
+    raise_amount = 1.04
+
+    def __init__(self, first, last, pay):
+        self.first = first
+        self.last = last
+        self.pay = pay
+
+    @property
+    def email(self):
+        return "{}.{}@company.com".format(self.first, self.last)
+
+    @property
+    def fullname(self):
+        return "{} {}".format(self.first, self.last)
+
+    @fullname.setter
+    def fullname(self, name):
+        first, last = name.split(" ")
+        self.first = first
+        self.last = last
+
+    @fullname.deleter
+    def fullname(self):
+        self.first = None
+        self.last = None
+
+    def apply_raise(self):
+        self.pay = int(self.pay * self.raise_amount)
+
+
+class Developer(Employee):
+    raise_amount = 1.10
+
+    def __init__(self, first, last, pay, programming_language):
+        super().__init__(first, last, pay)
+        self.programming_language = programming_language
+
+
+class Manager(Employee):
+    def __init__(self, first, last, pay, employees=None):
+        super().__init__(first, last, pay)
+
+        if employees is None:
+            self.employees = []
+        else:
+            self.employees = employees
+
+
+# Slotted classes, the attributes are stored in fixed slots on the instance and there is no __dict__
+# Only the names listed in __slots__ can be assigned on an instance
+class SlotEmployee(object):
+
+    __slots__ = ("first", "last", "pay")
+
+    # Class variables still live in the class namespace, so they are shared and can be overridden
+    # by a subclass or changed with SlotEmployee.raise_amount = 1.05 exactly as before
+    # But an instance can no longer shadow it with emp_1.raise_amount = 1.06 (tutorial_2),
+    # that raises AttributeError because raise_amount is not a slot and is read-only on the instance
+    raise_amount = 1.04
+
+    def __init__(self, first, last, pay):
+        self.first = first
+        self.last = last
+        self.pay = pay
+
+    # Properties are defined on the class, so they work the same with slots
+    @property
+    def email(self):
+        return "{}.{}@company.com".format(self.first, self.last)
+
+    @property
+    def fullname(self):
+        return "{} {}".format(self.first, self.last)
+
+    @fullname.setter
+    def fullname(self, name):
+        first, last = name.split(" ")
+        self.first = first
+        self.last = last
+
+    @fullname.deleter
+    def fullname(self):
+        self.first = None
+        self.last = None
+
+    def apply_raise(self):
+        self.pay = int(self.pay * self.raise_amount)
+
+
+class SlotDeveloper(SlotEmployee):
+    # A subclass has to declare __slots__ too, otherwise it gets a __dict__ back
+    # Only the new attributes are listed, first, last and pay come from the parent class
+    __slots__ = ("programming_language",)
+
+    raise_amount = 1.10
+
+    def __init__(self, first, last, pay, programming_language):
+        super().__init__(first, last, pay)
+        self.programming_language = programming_language
+
+
+class SlotManager(SlotEmployee):
+    __slots__ = ("employees",)
+
+    def __init__(self, first, last, pay, employees=None):
+        super().__init__(first, last, pay)
+
+        if employees is None:
+            self.employees = []
+        else:
+            self.employees = employees
+
+
+def measure(emp_cls, n):
+    # tracemalloc counts every block allocated by Python while it is tracing
+    # The names are built before tracing starts so only the objects themselves are measured
+    firsts = ["Test{}".format(i) for i in range(n)]
+
+    tracemalloc.start()
+    employees = [emp_cls(first, "User", 50000) for first in firsts]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # The list holding the objects is 8 bytes per instance, it is the same for both versions
+    list_size = employees.__sizeof__()
+    bytes_per_instance = (current - list_size) / n
+
+    # Construction time is measured without tracemalloc, which slows allocation down
+    del employees
+    start = time.perf_counter()
+    employees = [emp_cls(first, "User", 50000) for first in firsts]
+    finish = time.perf_counter()
+    per_second = n / (finish - start)
+
+    return bytes_per_instance, per_second
+
+
+def benchmark(n=1_000_000):
+    print("Benchmark of {} instances".format(n))
+    print()
+
+    for emp_cls in (Employee, SlotEmployee, Manager, SlotManager):
+        bytes_per_instance, per_second = measure(emp_cls, n)
+        print(
+            f"{emp_cls.__name__:<14} {round(bytes_per_instance, 1):>8} bytes/instance "
+            f"{round(per_second):>12,} instances/second"
+        )
+    print()
+
+
+def main():
+    emp_1 = Employee("John", "Smith", 50000)
+    emp_2 = SlotEmployee("John", "Smith", 50000)
+
+    # The regular instance has a namespace, the slotted one does not
+    print(emp_1.__dict__)
+    print(hasattr(emp_2, "__dict__"))
+    print(SlotEmployee.__slots__)
+    print()
+
+    # Properties, setters and deleters from tutorial_6 behave the same
+    emp_2.fullname = "Jane Doe"
+    print(emp_2.first)
+    print(emp_2.email)
+    print(emp_2.fullname)
+    print()
+
+    # Class level raise_amount overrides still work
+    dev_1 = SlotDeveloper("Steve", "Smith", 60000, "Python")
+    dev_1.apply_raise()
+    print(dev_1.pay)
+    SlotEmployee.raise_amount = 1.05
+    emp_2.apply_raise()
+    print(emp_2.pay)
+    SlotEmployee.raise_amount = 1.04
+    print()
+
+    # Instance level override is not possible anymore
+    try:
+        emp_2.raise_amount = 1.06
+    except AttributeError as err:
+        print(err)
+    print()
+
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# Columnar Employee Table - apply a raise to every employee with one vectorized operation
+
+import time
+
+import numpy as np
+
+
+# Same Employee hierarchy as in tutorial_4
+class Employee(object):
+
+    raise_amount = 1.04
+
+    def __init__(self, first, last, pay):
+        self.first = first
+        self.last = last
+        self.pay = pay
+        self.email = first + "." + last + "@company.com"
+
+    def fullname(self):
+        return "{} {}".format(self.first, self.last)
+
+    def apply_raise(self):
+        self.pay = int(self.pay * self.raise_amount)
+
+
+class Developer(Employee):
+    raise_amount = 1.10
+
+    def __init__(self, first, last, pay, programming_language):
+        super().__init__(first, last, pay)
+        self.programming_language = programming_language
+
+
+class Manager(Employee):
+    def __init__(self, first, last, pay, employees=None):
+        super().__init__(first, last, pay)
+
+        if employees is None:
+            self.employees = []
+        else:
+            self.employees = employees
+
+
+class EmployeeTable(object):
+    # Instead of one object per employee, the table keeps one array per attribute (a column)
+    # pay is an int64 array, first and last are object arrays,
+    # and class_code is the index of the employee's class inside self.classes
+    # A raise on the whole table is then a single multiplication over the pay column
+
+    def __init__(self, first, last, pay, class_code, classes):
+        self.first = np.asarray(first, dtype=object)
+        self.last = np.asarray(last, dtype=object)
+        self.pay = np.asarray(pay, dtype=np.int64)
+        self.class_code = np.asarray(class_code, dtype=np.int16)
+        # classes is a list like [Employee, Developer, Manager], class_code 1 means Developer
+        self.classes = list(classes)
+
+        if not (len(self.first) == len(self.last) == len(self.pay) == len(self.class_code)):
+            raise ValueError("all columns of an EmployeeTable must have the same length")
+
+    @classmethod
+    def from_employees(cls, employees):
+        # Alternative constructor (see tutorial_3) building the columns from existing objects
+        # Any Employee, Developer or Manager (or other subclass) can be mixed together
+        classes = []
+        codes_by_class = {}
+        first, last, pay, class_code = [], [], [], []
+
+        for emp in employees:
+            emp_cls = type(emp)
+            if emp_cls not in codes_by_class:
+                codes_by_class[emp_cls] = len(classes)
+                classes.append(emp_cls)
+
+            first.append(emp.first)
+            last.append(emp.last)
+            # from_string in tutorial_3 leaves pay as a str, so it is converted here once
+            pay.append(int(emp.pay))
+            class_code.append(codes_by_class[emp_cls])
+
+        return cls(first, last, pay, class_code, classes)
+
+    def __len__(self):
+        return len(self.pay)
+
+    def raise_amounts(self):
+        # Look up raise_amount on the class every time, so changing Developer.raise_amount
+        # or calling set_raise_amount (tutorial_3) is picked up by the next apply_raise
+        rates = np.array([emp_cls.raise_amount for emp_cls in self.classes], dtype=np.float64)
+        # Fancy indexing turns one rate per class into one rate per row
+        return rates[self.class_code]
+
+    def apply_raise(self):
+        # Scalar version: self.pay = int(self.pay * self.raise_amount)
+        # int() of a float truncates towards zero, and so does casting a float64 array to int64
+        # Both multiply in double precision, so every row ends up with exactly the same pay
+        self.pay = (self.pay * self.raise_amounts()).astype(np.int64)
+
+    def fullname(self, row):
+        return "{} {}".format(self.first[row], self.last[row])
+
+    def email(self, row):
+        return self.first[row] + "." + self.last[row] + "@company.com"
+
+    def employee_class(self, row):
+        return self.classes[self.class_code[row]]
+
+    def write_back(self, employees):
+        # Copy the pay column back onto the objects the table was built from
+        # employees must be in the same order as they were given to from_employees
+        for emp, pay in zip(employees, self.pay.tolist()):
+            emp.pay = pay
+
+
+def make_employees(n):
+    employees = []
+    for i in range(n):
+        if i % 3 == 0:
+            employees.append(Employee("Test", "User{}".format(i), 50000 + i))
+        elif i % 3 == 1:
+            employees.append(Developer("Test", "User{}".format(i), 60000 + i, "Python"))
+        else:
+            employees.append(Manager("Test", "User{}".format(i), 90000 + i))
+    return employees
+
+
+def benchmark(n=1_000_000):
+    print("Benchmark of apply_raise on {} employees".format(n))
+    print()
+
+    employees = make_employees(n)
+    table = EmployeeTable.from_employees(employees)
+
+    # One Python call per object
+    start = time.perf_counter()
+    for emp in employees:
+        emp.apply_raise()
+    finish = time.perf_counter()
+    loop_time = finish - start
+    print(f"Per-object loop: {round(loop_time, 4)} second(s)")
+
+    # One vectorized call for the whole table
+    start = time.perf_counter()
+    table.apply_raise()
+    finish = time.perf_counter()
+    table_time = finish - start
+    print(f"EmployeeTable:   {round(table_time, 4)} second(s)")
+
+    # Both paths must give the same pay for every single employee
+    same = table.pay.tolist() == [emp.pay for emp in employees]
+    print("Same result: ", same)
+    if table_time > 0:
+        print(f"Speedup: {round(loop_time / table_time, 1)}x")
+    print()
+
+
+def main():
+    emp_1 = Employee("John", "Doe", 50000)
+    dev_1 = Developer("Steve", "Smith", 60000, "Python")
+    mgr_1 = Manager("Sue", "Smith", 90000, [emp_1, dev_1])
+
+    table = EmployeeTable.from_employees([emp_1, dev_1, mgr_1])
+    print(table.pay)
+    table.apply_raise()
+    # Developer gets 10%, Employee and Manager get 4%
+    print(table.pay)
+    print()
+
+    for row in range(len(table)):
+        print("{} : {} : {}".format(table.fullname(row), table.employee_class(row).__name__, table.pay[row]))
+    print()
+
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# executor.map that reads its input lazily, only a window of tasks is submitted at a time
+# executor.map(do_something, secs) (tutorial_8 example 3, tutorial_9 example_8) submits every item
+# before it returns, so a generator of millions of inputs becomes millions of futures in memory
+# before the first result is looked at, and an endless generator never returns at all
+# imap submits window tasks, then one new task each time a result is taken
+
+import collections
+import concurrent.futures
+import itertools
+import os
+import time
+import tracemalloc
+
+
+def imap(executor, fn, *iterables, window=None, ordered=True, timeout=None):
+    # Works with ThreadPoolExecutor, ProcessPoolExecutor or any other Executor, only submit is used
+    #   window  - tasks in flight at most, by default twice the number of workers
+    #   ordered - True gives the results in the order of the inputs like executor.map,
+    #             False gives them as they complete like as_completed
+    #   timeout - seconds from the call for all the results, like executor.map
+    # An exception raised by fn is raised when its result is reached, the tasks still waiting are then cancelled
+    # Stopping the iteration early (break) also cancels them
+    if window is None:
+        window = 2 * (getattr(executor, "_max_workers", None) or os.cpu_count() or 1)
+    if window < 1:
+        raise ValueError("window must be at least 1")
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    arguments = zip(*iterables)
+    return (_ordered if ordered else _completed)(executor, fn, arguments, window, deadline)
+
+
+def _remaining(deadline):
+    return None if deadline is None else max(0, deadline - time.monotonic())
+
+
+def _ordered(executor, fn, arguments, window, deadline):
+    in_flight = collections.deque(executor.submit(fn, *args) for args in itertools.islice(arguments, window))
+    try:
+        while in_flight:
+            # The oldest task has to be done before anything is given out, the others keep running meanwhile
+            result = in_flight[0].result(_remaining(deadline))
+            in_flight.popleft()
+            for args in itertools.islice(arguments, 1):
+                in_flight.append(executor.submit(fn, *args))
+            yield result
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def _completed(executor, fn, arguments, window, deadline):
+    in_flight = {executor.submit(fn, *args) for args in itertools.islice(arguments, window)}
+    try:
+        while in_flight:
+            done, in_flight = concurrent.futures.wait(
+                in_flight, _remaining(deadline), return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            if not done:
+                raise concurrent.futures.TimeoutError()
+            # Refill first, so the workers are busy while the results are used
+            for args in itertools.islice(arguments, len(done)):
+                in_flight.add(executor.submit(fn, *args))
+            for future in done:
+                yield future.result()
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def do_something(seconds):
+    time.sleep(seconds)
+    return f"Done Sleeping for {seconds} second..."
+
+
+def square(number):
+    return number * number
+
+
+def benchmark(n=100_000):
+    print("Benchmark, the first result of {} tasks and the memory used".format(n))
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        for label, make in (
+            ("executor.map:", lambda: executor.map(square, range(n))),
+            ("imap:", lambda: imap(executor, square, range(n))),
+            ("imap unordered:", lambda: imap(executor, square, range(n), ordered=False)),
+        ):
+            tracemalloc.start()
+            start = time.perf_counter()
+            results = make()
+            next(results)
+            first = time.perf_counter()
+            total = 1 + sum(1 for _ in results)
+            finish = time.perf_counter()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{label:<16} first result after {round((first-start) * 1e3, 1)} ms, "
+                f"all {total} in {round(finish-start, 2)} second(s), peak {round(peak / 1024 ** 2, 1)} MB"
+            )
+    print()
+
+
+def main():
+    # Example 3 of tutorial_8, the same output as executor.map
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        for result in imap(executor, do_something, [3, 2.5, 1.5, 1]):
+            print(result)
+    finish = time.perf_counter()
+    print(f"Finished in {round(finish-start, 2)} second(s)")
+    print()
+
+    # Completion order, the 1 second job first
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        for result in imap(executor, do_something, [3, 2.5, 1.5, 1], ordered=False):
+            print(result)
+    finish = time.perf_counter()
+    print(f"Finished in {round(finish-start, 2)} second(s)")
+    print()
+
+    # An endless input with processes, executor.map would never return
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        squares = imap(executor, square, itertools.count())
+        print(list(itertools.islice(squares, 10)))
+        squares.close()
+    print()
+
+    benchmark()
+
+
+# Needed for the ProcessPoolExecutor on windows
+if __name__ == "__main__":
+    main()
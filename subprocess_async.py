@@ -0,0 +1,102 @@
+# Run many external commands concurrently with asyncio, with a limit on how many run at the same time
+
+import asyncio
+import shlex
+import subprocess
+import time
+
+
+async def run(
+    args, input=None, capture_output=False, text=False, timeout=None, check=False, cwd=None, env=None
+):
+    # The asyncio version of subprocess.run, it returns the same CompletedProcess
+    # While the command runs, the event loop is free to start and watch other commands
+    # A string is split like the shell would split it, but no shell is used
+    if isinstance(args, str):
+        args = shlex.split(args)
+    if input is not None and text:
+        input = input.encode("utf-8")
+
+    pipe = subprocess.PIPE if capture_output else None
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=subprocess.PIPE if input is not None else None,
+        stdout=pipe,
+        stderr=pipe,
+        cwd=cwd,
+        env=env,
+    )
+
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(input), timeout)
+    except asyncio.TimeoutError:
+        # Same as subprocess.run, the child is killed and TimeoutExpired is raised
+        process.kill()
+        await process.wait()
+        raise subprocess.TimeoutExpired(args, timeout) from None
+    except asyncio.CancelledError:
+        # Never leave a child running when the task running it is cancelled
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    if text:
+        stdout = stdout.decode("utf-8") if stdout is not None else None
+        stderr = stderr.decode("utf-8") if stderr is not None else None
+
+    result = subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
+    if check:
+        result.check_returncode()
+    return result
+
+
+async def run_all(commands, limit=10, return_exceptions=False, **kwargs):
+    # Runs every command in commands with at most limit of them running at the same time
+    # kwargs are passed to run (capture_output, text, timeout, check, ...), timeout is per command
+    # The results come back in the same order as commands
+    # With return_exceptions=True a failing command (TimeoutExpired, CalledProcessError, command not found)
+    # puts its exception in the results instead of stopping the whole batch, like asyncio.gather
+    semaphore = asyncio.Semaphore(limit)
+
+    async def limited(args):
+        async with semaphore:
+            return await run(args, **kwargs)
+
+    return await asyncio.gather(*(limited(args) for args in commands), return_exceptions=return_exceptions)
+
+
+def run_batch(commands, limit=10, return_exceptions=False, **kwargs):
+    # For code that is not async itself
+    return asyncio.run(run_all(commands, limit=limit, return_exceptions=return_exceptions, **kwargs))
+
+
+def main():
+    commands = ["ls -la", "ls -la doesnotexist", "sleep 5", "echo hello"]
+    results = run_batch(commands, limit=2, capture_output=True, text=True, timeout=1, return_exceptions=True)
+    for command, result in zip(commands, results):
+        if isinstance(result, Exception):
+            print(command, "->", result)
+        else:
+            print(command, "-> returncode:", result.returncode)
+    print()
+
+    # Benchmark, 100 commands taking 0.1 second each
+    commands = [["sleep", "0.1"]] * 100
+
+    start = time.perf_counter()
+    for args in commands:
+        subprocess.run(args)
+    finish = time.perf_counter()
+    print(f"subprocess.run one after another: {round(finish-start, 2)} second(s)")
+
+    for limit in (10, 50, 100):
+        start = time.perf_counter()
+        run_batch(commands, limit=limit)
+        finish = time.perf_counter()
+        print(f"run_batch limit={limit:<3}:            {round(finish-start, 2)} second(s)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
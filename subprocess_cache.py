@@ -0,0 +1,135 @@
+# Opt-in cache of command results, running the same idempotent command twice only starts it once
+
+import collections
+import hashlib
+import os
+import shlex
+import subprocess
+import time
+
+
+class CommandCache(object):
+    # The key of a result is a hash of everything that can change the output of the command:
+    #   the arguments, the stdin input, the environment, the working directory,
+    #   and the modification time and size of every declared input path (output.txt for example)
+    # Touching a declared input gives a different key, so the old result is simply never found again
+    # and is pushed out of the cache by newer results
+    # The results are kept in least recently used order and the cache holds at most max_bytes of output
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def key(self, args, input=None, inputs=(), cwd=None, env=None):
+        digest = hashlib.sha256()
+
+        def add(*parts):
+            for part in parts:
+                part = part if isinstance(part, bytes) else str(part).encode("utf-8", "surrogateescape")
+                # The length goes first so that ("ab", "c") and ("a", "bc") do not collide
+                digest.update(len(part).to_bytes(8, "little"))
+                digest.update(part)
+
+        add("args", *args)
+        add("input", hashlib.sha256(input).digest() if input is not None else b"")
+        cwd = os.path.abspath(cwd if cwd is not None else os.getcwd())
+        add("cwd", cwd)
+        environment = env if env is not None else os.environ
+        add("env", *("{}={}".format(name, value) for name, value in sorted(environment.items())))
+        for path in inputs:
+            path = os.path.join(cwd, path)
+            try:
+                stat = os.stat(path)
+                add("input path", path, stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            except FileNotFoundError:
+                add("missing input path", path)
+        return digest.hexdigest()
+
+    def run(self, args, input=None, inputs=(), text=False, check=False, cwd=None, env=None):
+        # Same as subprocess.run(args, capture_output=True), the output has to be captured to be cached
+        # inputs is the list of files the command reads, a change to any of them runs the command again
+        if isinstance(args, str):
+            args = shlex.split(args)
+        if input is not None and text:
+            input = input.encode("utf-8")
+
+        key = self.key(args, input, inputs, cwd, env)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            returncode, stdout, stderr = entry
+        else:
+            self.misses += 1
+            process = subprocess.run(args, input=input, capture_output=True, cwd=cwd, env=env)
+            returncode, stdout, stderr = process.returncode, process.stdout, process.stderr
+            self._store(key, (returncode, stdout, stderr), len(stdout) + len(stderr))
+
+        if text:
+            stdout = stdout.decode("utf-8")
+            stderr = stderr.decode("utf-8")
+        # A new CompletedProcess every time, the cached bytes themselves cannot be changed
+        result = subprocess.CompletedProcess(args, returncode, stdout, stderr)
+        if check:
+            result.check_returncode()
+        return result
+
+    def _store(self, key, entry, size):
+        if size > self.max_bytes:
+            # Would push everything else out and still not fit
+            return
+        self._entries[key] = entry
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, stdout, stderr) = self._entries.popitem(last=False)
+            self.size -= len(stdout) + len(stderr)
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return "CommandCache({} entries, {} bytes, {} hits, {} misses)".format(
+            len(self._entries), self.size, self.hits, self.misses
+        )
+
+
+def main():
+    cache = CommandCache()
+
+    # ls -la five times, only the first one is started
+    start = time.perf_counter()
+    for _ in range(5):
+        subprocess.run(["ls", "-la"], capture_output=True)
+    finish = time.perf_counter()
+    print(f"subprocess.run x5: {round((finish-start) * 1e3, 2)} millisecond(s)")
+
+    start = time.perf_counter()
+    for _ in range(5):
+        p1 = cache.run(["ls", "-la"], text=True)
+    finish = time.perf_counter()
+    print(f"cache.run x5:      {round((finish-start) * 1e3, 2)} millisecond(s)")
+    print(cache)
+    print()
+
+    # Failing commands are cached too, check=True still raises
+    p6 = cache.run("ls -la doesnotexist", text=True)
+    print(p6.returncode, p6.stderr)
+
+    # A declared input, a change to output.txt runs the command again
+    p7 = cache.run(["grep", "tutorial", "output.txt"], inputs=["output.txt"])
+    p7 = cache.run(["grep", "tutorial", "output.txt"], inputs=["output.txt"])
+    print(cache)
+    os.utime("output.txt")
+    p7 = cache.run(["grep", "tutorial", "output.txt"], inputs=["output.txt"])
+    print(cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# Capture command output in memory up to a limit, then spill it to a temporary file
+
+import mmap
+import shlex
+import subprocess
+import tempfile
+import threading
+
+# Output larger than this goes to a temporary file instead of staying in memory
+SPILL_THRESHOLD = 16 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+class SpooledOutput(object):
+    # Holds the output of one stream (stdout or stderr)
+    # Small output stays in a bytearray, once it grows past threshold everything is moved to
+    # a temporary file, like redirecting stdout to a file in the p4 example of tutorial_7,
+    # but without the caller having to set it up
+    # After the command is done:
+    #   buffer  - the whole output as bytes-like object, a memoryview or a read-only mmap of the file
+    #   lines() - the lines one at a time, nothing is decoded or copied up front
+
+    def __init__(self, threshold=SPILL_THRESHOLD, encoding=None):
+        self.threshold = threshold
+        self.encoding = encoding
+        self._memory = bytearray()
+        self._file = None
+        self._map = None
+        self.size = 0
+
+    @property
+    def spilled(self):
+        return self._file is not None
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self._file is None:
+            self._memory += chunk
+            if len(self._memory) > self.threshold:
+                # Move what is already in memory to the file, everything after goes straight to it
+                self._file = tempfile.TemporaryFile()
+                self._file.write(self._memory)
+                self._memory = bytearray()
+        else:
+            self._file.write(chunk)
+
+    def finish(self):
+        if self._file is not None:
+            self._file.flush()
+            if self.size:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def buffer(self):
+        if self._map is not None:
+            return self._map
+        if self._file is not None:
+            # An empty file cannot be mapped
+            return memoryview(b"")
+        return memoryview(self._memory)
+
+    def lines(self):
+        # Works the same on bytes and on mmap, both have find
+        # The line ending is kept, like iterating over a file
+        if self._file is not None and self._map is None:
+            # Spilled but empty
+            return
+        buffer = self._map if self._map is not None else self._memory
+        start = 0
+        while start < self.size:
+            newline = buffer.find(b"\n", start)
+            stop = self.size if newline == -1 else newline + 1
+            line = buffer[start:stop]
+            yield line.decode(self.encoding) if self.encoding else bytes(line)
+            start = stop
+
+    def __iter__(self):
+        return self.lines()
+
+    def __len__(self):
+        return self.size
+
+    def read(self):
+        # The whole output at once, this is what capture_output=True would have given
+        data = bytes(self.buffer)
+        return data.decode(self.encoding) if self.encoding else data
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+        self._memory = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        where = "file" if self.spilled else "memory"
+        return "SpooledOutput({} bytes in {})".format(self.size, where)
+
+
+def run(args, input=None, threshold=SPILL_THRESHOLD, text=False, check=False, cwd=None, env=None):
+    # Like subprocess.run(args, capture_output=True), but stdout and stderr are SpooledOutput
+    # objects instead of bytes, so a command printing gigabytes does not need gigabytes of memory
+    # With text=True the lines are decoded one at a time when they are iterated
+    if isinstance(args, str):
+        args = shlex.split(args)
+    if input is not None and text:
+        input = input.encode("utf-8")
+    encoding = "utf-8" if text else None
+
+    stdout = SpooledOutput(threshold, encoding)
+    stderr = SpooledOutput(threshold, encoding)
+
+    process = subprocess.Popen(
+        args,
+        stdin=subprocess.PIPE if input is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        env=env,
+    )
+    # Both pipes are read at the same time, reading one to the end first could deadlock
+    # when the child fills the other one
+    readers = [
+        threading.Thread(target=_copy, args=(process.stdout, stdout), daemon=True),
+        threading.Thread(target=_copy, args=(process.stderr, stderr), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    if input is not None:
+        try:
+            process.stdin.write(input)
+        except BrokenPipeError:
+            pass
+        process.stdin.close()
+    for reader in readers:
+        reader.join()
+    returncode = process.wait()
+
+    stdout.finish()
+    stderr.finish()
+
+    result = subprocess.CompletedProcess(args, returncode, stdout, stderr)
+    if check and returncode:
+        raise subprocess.CalledProcessError(returncode, args, stdout, stderr)
+    return result
+
+
+def _copy(pipe, output):
+    with pipe:
+        for chunk in iter(lambda: pipe.read(CHUNK_SIZE), b""):
+            output.write(chunk)
+
+
+def main():
+    # Small output stays in memory
+    p1 = run(["ls", "-la"], text=True)
+    print(p1.stdout)
+    for line in p1.stdout:
+        print(line, end="")
+    print()
+
+    # Large output spills to a file, only the threshold is ever held in memory
+    p2 = run(["seq", "1", "5000000"], threshold=1024 * 1024)
+    print(p2.stdout)
+    print(p2.stdout.buffer[:20])
+    print(sum(1 for _ in p2.stdout.lines()))
+    p2.stdout.close()
+    print()
+
+    # stderr and check work like subprocess.run
+    try:
+        run("ls -la doesnotexist", text=True, check=True)
+    except subprocess.CalledProcessError as err:
+        print(err)
+        print(err.stderr.read())
+
+
+if __name__ == "__main__":
+    main()
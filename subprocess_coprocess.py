@@ -0,0 +1,195 @@
+# Long-lived shell session - one shell process runs many commands instead of one new shell per command
+
+import os
+import selectors
+import shlex
+import signal
+import subprocess
+import threading
+import time
+import uuid
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ShellSession(object):
+    # subprocess.run("...", shell=True) starts a new /bin/sh for every command (p8 in tutorial_7)
+    # Here one shell is started once and commands are written to its stdin
+    # After each command the shell prints a unique sentinel line with the exit status on stdout
+    # and the same sentinel on stderr, everything before the sentinels is that command's output
+    # Note: the commands run in the same shell, so cd and variables are kept from one command to the next
+
+    def __init__(self, shell="/bin/sh", cwd=None, env=None):
+        self.shell = shell
+        self.cwd = cwd
+        self.env = env
+        self._lock = threading.Lock()
+        self._process = None
+        self._start()
+
+    def _start(self):
+        self._process = subprocess.Popen(
+            [self.shell],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.cwd,
+            env=self.env,
+            # The shell gets its own process group, so close() can kill it together with a command still running
+            start_new_session=True,
+        )
+        for pipe in (self._process.stdout, self._process.stderr):
+            os.set_blocking(pipe.fileno(), False)
+
+    def run(self, command, text=False, check=False, timeout=None):
+        # Returns the same CompletedProcess as subprocess.run(command, shell=True, capture_output=True)
+        with self._lock:
+            if self._process.poll() is not None:
+                # The shell died (exit was run for example), start a new one
+                self._start()
+
+            sentinel = "__done_{}__".format(uuid.uuid4().hex)
+            # stdin of the command is /dev/null, otherwise it could read the next commands meant for the shell
+            # The command goes through "command eval", a syntax error then gives exit status 2 instead of
+            # making the shell exit ("command" keeps eval from being a special built-in that exits on errors)
+            # The newline before each sentinel makes sure it starts on its own line, it is removed again below
+            script = (
+                "{command}\n"
+                "__status=$?\n"
+                "printf '\\n%s %d\\n' {sentinel} $__status\n"
+                "printf '\\n%s\\n' {sentinel} >&2\n"
+            ).format(command="command eval " + shlex.quote(command) + " </dev/null", sentinel=sentinel)
+
+            try:
+                self._process.stdin.write(script.encode("utf-8"))
+                self._process.stdin.flush()
+                returncode, stdout, stderr = self._read_until(command, sentinel, timeout)
+            except BaseException:
+                # After a timeout or a broken pipe the session is in an unknown state, throw it away
+                self.close()
+                raise
+
+        if text:
+            stdout = stdout.decode("utf-8")
+            stderr = stderr.decode("utf-8")
+        result = subprocess.CompletedProcess(command, returncode, stdout, stderr)
+        if check:
+            result.check_returncode()
+        return result
+
+    def _read_until(self, command, sentinel, timeout):
+        stdout_end = "\n{} ".format(sentinel).encode("utf-8")
+        stderr_end = "\n{}\n".format(sentinel).encode("utf-8")
+        buffers = {self._process.stdout: bytearray(), self._process.stderr: bytearray()}
+        done = {self._process.stdout: False, self._process.stderr: False}
+        # Where stdout_end starts in the stdout buffer, once it has been seen
+        position = -1
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        with selectors.DefaultSelector() as selector:
+            for pipe in buffers:
+                selector.register(pipe, selectors.EVENT_READ)
+
+            while not all(done.values()):
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise subprocess.TimeoutExpired(command, timeout)
+                for key, _ in selector.select(remaining):
+                    chunk = os.read(key.fileobj.fileno(), CHUNK_SIZE)
+                    if not chunk:
+                        # The command ended the shell (exit for example)
+                        return self._shell_exited(buffers)
+                    buffer = buffers[key.fileobj]
+                    buffer += chunk
+                    if key.fileobj is self._process.stdout:
+                        # Only the new data is searched (and the end of the old data, the sentinel
+                        # can be cut between two chunks), the whole buffer each time would be quadratic
+                        if position == -1:
+                            position = buffer.find(stdout_end, max(0, len(buffer) - len(chunk) - len(stdout_end)))
+                        # "\n<sentinel> <status>\n", the status is complete once the last newline arrived
+                        done[key.fileobj] = position != -1 and buffer.endswith(b"\n")
+                    else:
+                        done[key.fileobj] = buffer.endswith(stderr_end)
+                    if done[key.fileobj]:
+                        selector.unregister(key.fileobj)
+
+        stdout = buffers[self._process.stdout]
+        returncode = int(stdout[position + len(stdout_end) :])
+        stderr = buffers[self._process.stderr]
+        return returncode, bytes(stdout[:position]), bytes(stderr[: -len(stderr_end)])
+
+    def _shell_exited(self, buffers):
+        # The shell is reaped and what it wrote before exiting is read, its exit status is the one of the command
+        # like subprocess.run("exit 3", shell=True), the next run starts a new shell
+        returncode = self._process.wait()
+        for pipe, buffer in buffers.items():
+            while True:
+                try:
+                    chunk = os.read(pipe.fileno(), CHUNK_SIZE)
+                except BlockingIOError:
+                    # A command started in the background still has the pipe open
+                    break
+                if not chunk:
+                    break
+                buffer += chunk
+        self.close()
+        return returncode, bytes(buffers[self._process.stdout]), bytes(buffers[self._process.stderr])
+
+    def close(self):
+        if self._process is not None and self._process.poll() is None:
+            os.killpg(self._process.pid, signal.SIGKILL)
+        if self._process is not None:
+            self._process.wait()
+            for pipe in (self._process.stdin, self._process.stdout, self._process.stderr):
+                pipe.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def benchmark(n=1_000):
+    print("Benchmark of {} small commands".format(n))
+    print()
+
+    start = time.perf_counter()
+    for i in range(n):
+        subprocess.run("echo {}".format(i), shell=True, capture_output=True)
+    finish = time.perf_counter()
+    print(f"subprocess.run(shell=True): {round(n / (finish-start))} commands/second")
+
+    with ShellSession() as session:
+        start = time.perf_counter()
+        for i in range(n):
+            session.run("echo {}".format(i))
+        finish = time.perf_counter()
+    print(f"ShellSession.run:           {round(n / (finish-start))} commands/second")
+    print()
+
+
+def main():
+    with ShellSession() as session:
+        p8 = session.run("cat output.txt | grep tutorial | awk -F\" \" '{ print $9 }'", text=True)
+        print(p8.stdout)
+
+        p5 = session.run("ls -la doesnotexist", text=True)
+        print("returncode: ", p5.returncode)
+        print("stderr: ", p5.stderr)
+
+        # Output without a trailing newline is returned as it is
+        print(repr(session.run("printf 'no newline'", text=True).stdout))
+
+        try:
+            session.run("sleep 5", timeout=0.5)
+        except subprocess.TimeoutExpired as err:
+            print(err)
+        # The session starts a new shell after a timeout
+        print(session.run("echo still working", text=True).stdout)
+
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
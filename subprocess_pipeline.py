@@ -0,0 +1,544 @@
+# Pipeline - connect commands with OS pipes, the output of one goes straight into the next
+
+import json
+import os
+import select
+import shlex
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on windows, Python stages then only report their wall time
+    resource = None
+
+# Size of the reads done by Python stages and by the capture of the final output
+CHUNK_SIZE = 64 * 1024
+# ru_maxrss is in kilobytes on linux and in bytes on macOS
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+# How often the memory of a running child is read, the interval doubles from the first to the second value
+PEAK_RSS_INTERVALS = (0.001, 0.05)
+
+
+class StageStats(object):
+    # Resources used by one stage of a pipeline
+    # Times are in seconds and memory is in bytes, the CPU times and ru_maxrss come from os.wait4
+    # peak_rss is the peak memory of the program the child runs, read from /proc while it runs (linux)
+    # Memory grown after the last read is missed, so it is a lower bound, None where /proc is not there
+    # ru_maxrss is not the peak of the child: the high water mark of a process is kept across exec,
+    # so it is at least the RSS of this process when the child was forked
+    # bytes_in and bytes_out are the bytes read from the previous stage and written to the next one,
+    # None when they were not measured (between two processes unless run(count_bytes=True))
+
+    def __init__(self, args):
+        self.args = args
+        self.returncode = None
+        self.wall_time = None
+        self.user_time = None
+        self.system_time = None
+        self.peak_rss = None
+        self.ru_maxrss = None
+        self.bytes_in = None
+        self.bytes_out = None
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+    def __repr__(self):
+        return "StageStats({})".format(", ".join("{}={!r}".format(name, value) for name, value in self.__dict__.items()))
+
+
+class PipelineResult(subprocess.CompletedProcess):
+    # Same surface as the CompletedProcess returned by subprocess.run (args, returncode, stdout, stderr)
+    # returncode is the one of the last stage, like the shell
+    # returncodes has one entry per stage and stderrs has the stderr of each stage
+    # stats has a StageStats per stage and wall_time is the time of the whole pipeline
+
+    def __init__(self, args, returncodes, stdout=None, stderr=None, stderrs=None, stats=None, wall_time=None):
+        super().__init__(args, returncodes[-1], stdout, stderr)
+        self.returncodes = returncodes
+        self.stderrs = stderrs
+        self.stats = stats
+        self.wall_time = wall_time
+
+    def report(self):
+        return {
+            "args": self.args,
+            "returncode": self.returncode,
+            "wall_time": self.wall_time,
+            "stages": [stat.as_dict() for stat in self.stats or []],
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.report(), indent=indent)
+
+    def check_returncode(self):
+        # Like "set -o pipefail", the first stage that failed raises the error
+        stderrs = self.stderrs or [None] * len(self.args)
+        for args, returncode, stderr in zip(self.args, self.returncodes, stderrs):
+            if returncode:
+                raise subprocess.CalledProcessError(returncode, args, None, stderr)
+
+
+class ResourceReport(object):
+    # Adds up the StageStats of many pipeline runs, grouped by command name (cat, grep, PythonStage(upper), ...)
+    # Times and bytes are summed, peak_rss is the largest peak seen for that command
+
+    def __init__(self):
+        self.runs = 0
+        self.wall_time = 0.0
+        self.commands = {}
+
+    def add(self, result):
+        self.runs += 1
+        self.wall_time += result.wall_time or 0.0
+        for stat in result.stats or []:
+            name = stat.args[0] if isinstance(stat.args, list) else stat.args
+            totals = self.commands.setdefault(
+                name,
+                {
+                    "runs": 0,
+                    "failures": 0,
+                    "wall_time": 0.0,
+                    "user_time": 0.0,
+                    "system_time": 0.0,
+                    "peak_rss": 0,
+                    "bytes_in": 0,
+                    "bytes_out": 0,
+                },
+            )
+            totals["runs"] += 1
+            totals["failures"] += 1 if stat.returncode else 0
+            for field in ("wall_time", "user_time", "system_time", "bytes_in", "bytes_out"):
+                totals[field] += getattr(stat, field) or 0
+            totals["peak_rss"] = max(totals["peak_rss"], stat.peak_rss or 0)
+        return result
+
+    def report(self):
+        return {"runs": self.runs, "wall_time": self.wall_time, "commands": self.commands}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.report(), indent=indent)
+
+
+class PythonStage(object):
+    # A stage running in this process, func receives an iterator of bytes chunks
+    # and returns (or yields) the bytes chunks to pass on to the next stage
+    # It is the only way data enters Python while the pipeline runs
+
+    def __init__(self, func):
+        self.func = func
+
+    def __repr__(self):
+        return "PythonStage({})".format(getattr(self.func, "__name__", self.func))
+
+
+class Pipeline(object):
+    # Pipeline(["cat", "output.txt"], ["grep", "tutorial"]) is the same as "cat output.txt | grep tutorial"
+    # but no shell is started, the commands are started with Popen and their stdin/stdout are
+    # connected with os.pipe(), so the bytes go from one process to the next without being copied by Python
+    # The pipes have a fixed size buffer, a fast writer blocks until the reader catches up (backpressure)
+
+    def __init__(self, *commands):
+        self.stages = []
+        for command in commands:
+            self.pipe(command)
+
+    def pipe(self, command):
+        # A string is split like the shell would split it, but no shell is used
+        if isinstance(command, str):
+            command = shlex.split(command)
+        self.stages.append(list(command))
+        return self
+
+    def filter(self, func):
+        self.stages.append(PythonStage(func))
+        return self
+
+    def __or__(self, command):
+        # Pipeline(["cat", "output.txt"]) | "grep tutorial" | my_function
+        if callable(command) and not isinstance(command, (str, list, tuple)):
+            return self.filter(command)
+        return self.pipe(command)
+
+    def run(
+        self,
+        input=None,
+        stdin=None,
+        stdout=None,
+        stderr=None,
+        capture_output=False,
+        text=False,
+        check=False,
+        cwd=None,
+        env=None,
+        count_bytes=False,
+    ):
+        # Same keywords as subprocess.run, except shell (there is never a shell)
+        # count_bytes=True puts a relay between two processes to count the bytes going through
+        # The relay uses os.splice where it exists, so the data still does not enter Python
+        if not self.stages:
+            raise ValueError("a pipeline needs at least one stage")
+        if capture_output:
+            stdout = stderr = subprocess.PIPE
+        if input is not None and text:
+            input = input.encode("utf-8")
+
+        threads = []
+        errors = []
+        stderr_chunks = [[] for _ in self.stages]
+        stats = [StageStats(args) for args in self._stage_args()]
+        run_start = time.perf_counter()
+
+        # source is what the next stage reads from: None (inherit), a file object, or a pipe fd we own
+        source = stdin
+        source_is_ours = False
+        if input is not None:
+            read_fd, write_fd = os.pipe()
+            threads.append(_start(_feed, write_fd, input, errors))
+            source, source_is_ours = read_fd, True
+            stats[0].bytes_in = len(input)
+
+        try:
+            for index, stage in enumerate(self.stages):
+                last = index == len(self.stages) - 1
+
+                if not last or stdout == subprocess.PIPE:
+                    read_fd, write_fd = os.pipe()
+                    sink, next_source = write_fd, read_fd
+                    between_processes = not (
+                        last or isinstance(stage, PythonStage) or isinstance(self.stages[index + 1], PythonStage)
+                    )
+                    if count_bytes and between_processes:
+                        # stage -> pipe -> relay -> pipe -> next stage, the relay owns the two middle ends
+                        relay_read, relay_write = os.pipe()
+                        threads.append(_start(_relay, read_fd, relay_write, stats[index], stats[index + 1]))
+                        next_source = relay_read
+                else:
+                    sink, next_source = stdout, None
+
+                if isinstance(stage, PythonStage):
+                    # The thread owns both ends it uses and closes them when it is done
+                    thread = _start(
+                        _run_python_stage,
+                        stage,
+                        source,
+                        source_is_ours,
+                        sink,
+                        next_source is not None,
+                        errors,
+                        stats[index],
+                    )
+                    threads.append(thread)
+                else:
+                    start = time.perf_counter()
+                    try:
+                        process = subprocess.Popen(
+                            stage,
+                            stdin=source,
+                            stdout=sink,
+                            stderr=subprocess.PIPE if stderr == subprocess.PIPE else stderr,
+                            cwd=cwd,
+                            env=env,
+                        )
+                    except OSError:
+                        # Command not found for example, the pipe made for this stage is not used
+                        if next_source is not None:
+                            os.close(sink)
+                            os.close(next_source)
+                        raise
+                    # The child is waited for in its own thread, so its wall time ends when it exits
+                    # and not when the pipeline gets around to waiting for it
+                    threads.append(_start(_reap, process, stats[index], start))
+                    if process.stderr is not None:
+                        threads.append(_start(_drain, process.stderr, stderr_chunks[index]))
+                    # The child has its own copies now, the parent has to close its copies
+                    # or the reader would never see end of file (and SIGPIPE would never reach the writer)
+                    if source_is_ours:
+                        os.close(source)
+                    if next_source is not None:
+                        os.close(sink)
+
+                source, source_is_ours = next_source, next_source is not None
+
+            output = None
+            if source_is_ours:
+                # The last stage writes into a pipe, read it here until every writer has closed it
+                with open(source, "rb") as reader:
+                    source_is_ours = False
+                    output = reader.read()
+                stats[-1].bytes_out = len(output)
+        finally:
+            if source_is_ours:
+                os.close(source)
+            # The reaper threads set the returncode of every process
+            for thread in threads:
+                thread.join()
+        wall_time = time.perf_counter() - run_start
+
+        if errors:
+            raise errors[0]
+
+        # What one stage wrote is what the next one read, fill in the side that was not measured
+        for stat, next_stat in zip(stats, stats[1:]):
+            if stat.bytes_out is None:
+                stat.bytes_out = next_stat.bytes_in
+            if next_stat.bytes_in is None:
+                next_stat.bytes_in = stat.bytes_out
+        returncodes = [stat.returncode for stat in stats]
+
+        stderrs = None
+        error_output = None
+        if stderr == subprocess.PIPE:
+            stderrs = [b"".join(chunks) for chunks in stderr_chunks]
+            error_output = b"".join(stderrs)
+        if text:
+            output = output.decode("utf-8") if output is not None else None
+            error_output = error_output.decode("utf-8") if error_output is not None else None
+            stderrs = [value.decode("utf-8") for value in stderrs] if stderrs is not None else None
+
+        result = PipelineResult(self._stage_args(), returncodes, output, error_output, stderrs, stats, wall_time)
+        if check:
+            result.check_returncode()
+        return result
+
+    def _stage_args(self):
+        return [stage if isinstance(stage, list) else repr(stage) for stage in self.stages]
+
+    def __repr__(self):
+        return " | ".join(
+            shlex.join(stage) if isinstance(stage, list) else repr(stage) for stage in self.stages
+        )
+
+
+def _start(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def _feed(write_fd, data, errors):
+    # Writes input into the first stage, in a thread so that a large input cannot deadlock
+    try:
+        with open(write_fd, "wb") as writer:
+            writer.write(data)
+    except BrokenPipeError:
+        # The first stage stopped reading (head for example), that is not an error
+        pass
+    except Exception as err:
+        errors.append(err)
+
+
+def _reap(process, stat, start):
+    # os.wait4 is waitpid plus the resource usage of the child (CPU times, peak memory)
+    # Popen.returncode is set here, so Popen never tries to wait for the child itself
+    if hasattr(os, "wait4"):
+        stat.peak_rss = _watch_peak_rss(process.pid)
+        _, status, usage = os.wait4(process.pid, 0)
+        stat.wall_time = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        stat.user_time = usage.ru_utime
+        stat.system_time = usage.ru_stime
+        stat.ru_maxrss = usage.ru_maxrss * RSS_UNIT
+    else:
+        process.wait()
+        stat.wall_time = time.perf_counter() - start
+    stat.returncode = process.returncode
+
+
+def _watch_peak_rss(pid):
+    # Returns once the child has exited, with the last VmHWM read from /proc/<pid>/status
+    # VmHWM is the high water mark since exec, Popen only returns after the exec so the first read is of the new program
+    # The child cannot be read once it has exited (a zombie has no memory left), so it is read while it runs:
+    # at once, then at growing intervals, with a pidfd to wake up as soon as it exits
+    if not hasattr(os, "pidfd_open"):
+        return None
+    try:
+        pidfd = os.pidfd_open(pid)
+    except OSError:
+        return None
+    peak = None
+    interval, max_interval = PEAK_RSS_INTERVALS
+    try:
+        while True:
+            peak = _read_vm_hwm(pid) or peak
+            if select.select([pidfd], [], [], interval)[0]:
+                return peak
+            interval = min(2 * interval, max_interval)
+    finally:
+        os.close(pidfd)
+
+
+def _read_vm_hwm(pid):
+    try:
+        with open("/proc/{}/status".format(pid), "rb") as f:
+            for line in f:
+                if line.startswith(b"VmHWM:"):
+                    # "VmHWM:     1234 kB"
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _relay(read_fd, write_fd, writer_stat, reader_stat):
+    # Moves everything from read_fd to write_fd and counts it
+    # os.splice moves the data between the two pipes inside the kernel, without copying it to Python
+    moved = 0
+    try:
+        while True:
+            if hasattr(os, "splice"):
+                count = os.splice(read_fd, write_fd, CHUNK_SIZE)
+            else:
+                data = os.read(read_fd, CHUNK_SIZE)
+                count = len(data)
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(write_fd, view) :]
+            if not count:
+                break
+            moved += count
+    except BrokenPipeError:
+        # The next stage exited, closing read_fd passes the SIGPIPE on to the writer
+        pass
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+        writer_stat.bytes_out = moved
+        reader_stat.bytes_in = moved
+
+
+def _drain(pipe, chunks):
+    # Reads one stderr pipe to the end, every stage has its own thread so that none of them can block
+    with pipe:
+        for chunk in iter(lambda: pipe.read(CHUNK_SIZE), b""):
+            chunks.append(chunk)
+
+
+def _run_python_stage(stage, source, source_is_ours, sink, sink_is_ours, errors, stat):
+    # source and sink are pipe fds owned by the pipeline, file objects given by the caller,
+    # or None for the stdin/stdout of this process
+    start = time.perf_counter()
+    # RUSAGE_THREAD gives the CPU time of this thread only (linux)
+    usage_start = resource.getrusage(resource.RUSAGE_THREAD) if hasattr(resource, "RUSAGE_THREAD") else None
+    counts = [0, 0]
+
+    def counted(chunks):
+        for chunk in chunks:
+            counts[0] += len(chunk)
+            yield chunk
+
+    if source is None:
+        reader = sys.stdin.buffer
+    elif isinstance(source, int):
+        reader = open(source, "rb", closefd=source_is_ours)
+    else:
+        reader = source
+    if sink is None:
+        writer = sys.stdout.buffer
+    elif isinstance(sink, int):
+        writer = open(sink, "wb", closefd=sink_is_ours)
+    else:
+        writer = sink
+
+    stat.returncode = 0
+    try:
+        chunks = counted(iter(lambda: reader.read(CHUNK_SIZE), b""))
+        for chunk in stage.func(chunks):
+            if chunk:
+                writer.write(chunk)
+                counts[1] += len(chunk)
+        writer.flush()
+    except BrokenPipeError:
+        # The next stage stopped reading, like a process killed by SIGPIPE
+        pass
+    except Exception as err:
+        stat.returncode = 1
+        errors.append(err)
+    finally:
+        stat.wall_time = time.perf_counter() - start
+        stat.bytes_in, stat.bytes_out = counts
+        if usage_start is not None:
+            usage = resource.getrusage(resource.RUSAGE_THREAD)
+            stat.user_time = usage.ru_utime - usage_start.ru_utime
+            stat.system_time = usage.ru_stime - usage_start.ru_stime
+        if isinstance(source, int):
+            reader.close()
+        if isinstance(sink, int):
+            try:
+                writer.close()
+            except BrokenPipeError:
+                pass
+
+
+def upper(chunks):
+    # Example of a Python filter stage
+    for chunk in chunks:
+        yield chunk.upper()
+
+
+def main():
+    # The p7 example from tutorial_7 without copying the output through Python
+    print("cat output.txt | grep tutorial | awk")
+    p7 = Pipeline(["cat", "output.txt"], ["grep", "tutorial"], ["awk", "-F", " ", "{ print $9 }"])
+    print(repr(p7))
+    result = p7.run(capture_output=True, text=True)
+    print(result.stdout)
+    print("returncodes: ", result.returncodes)
+    print()
+
+    # What every stage used, count_bytes=True also measures the bytes between cat and grep
+    result = p7.run(capture_output=True, count_bytes=True)
+    for stat in result.stats:
+        print(stat)
+    print()
+
+    # Many runs added up into one report
+    report = ResourceReport()
+    for _ in range(5):
+        report.add(p7.run(capture_output=True))
+    report.add((Pipeline(["cat", "output.txt"]) | upper | "grep TUTORIAL").run(capture_output=True))
+    print(report.to_json())
+    print()
+
+    # With a Python stage in the middle
+    print("With a Python filter stage")
+    result = (Pipeline(["cat", "output.txt"]) | upper | "grep TUTORIAL").run(capture_output=True, text=True)
+    print(result.stdout)
+    print()
+
+    # input and check work like subprocess.run
+    print("Failing stage with check=True")
+    try:
+        Pipeline(["ls", "-la", "doesnotexist"], ["wc", "-l"]).run(capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as err:
+        print(err)
+        print(err.stderr)
+
+    # Benchmark, the tutorial_7 way copies everything through Python twice
+    data = b"tutorial line with some words in it\n" * 2_000_000
+    start = time.perf_counter()
+    p = subprocess.run(["cat"], input=data, capture_output=True)
+    p = subprocess.run(["grep", "tutorial"], input=p.stdout, capture_output=True)
+    p = subprocess.run(["wc", "-l"], input=p.stdout, capture_output=True)
+    finish = time.perf_counter()
+    print(f"subprocess.run chain: {round(finish-start, 3)} second(s), {p.stdout.strip()}")
+
+    start = time.perf_counter()
+    p = Pipeline(["cat"], ["grep", "tutorial"], ["wc", "-l"]).run(input=data, capture_output=True)
+    finish = time.perf_counter()
+    print(f"Pipeline:             {round(finish-start, 3)} second(s), {p.stdout.strip()}")
+
+    start = time.perf_counter()
+    p = Pipeline(["cat"], ["grep", "tutorial"], ["wc", "-l"]).run(input=data, capture_output=True, count_bytes=True)
+    finish = time.perf_counter()
+    print(f"Pipeline count_bytes: {round(finish-start, 3)} second(s), {p.stdout.strip()}")
+    print([(stat.args[0], stat.bytes_in, stat.bytes_out) for stat in p.stats])
+    print()
+
+
+if __name__ == "__main__":
+    main()
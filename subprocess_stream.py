@@ -0,0 +1,236 @@
+# Stream the output of a command line by line while it runs, from stdout and stderr at the same time
+
+import asyncio
+import codecs
+import os
+import selectors
+import shlex
+import subprocess
+import sys
+import time
+
+CHUNK_SIZE = 64 * 1024
+# A line longer than this is handed out in pieces, so a command that never prints a newline
+# cannot make the memory grow without limit
+MAX_LINE = 1024 * 1024
+
+
+class StreamingProcess(object):
+    # Starts a command and hands out ("stdout", line) and ("stderr", line) tuples as soon as they arrive
+    # Both pipes are watched with selectors (epoll on linux), whichever has data is read,
+    # so a child filling its stderr pipe while we wait on stdout cannot deadlock
+    # Only the current incomplete line of each stream is kept in memory
+    #
+    #   for name, line in StreamingProcess(["ls", "-la"]):      - plain iteration
+    #   async for name, line in StreamingProcess(["ls", "-la"]): - from asyncio code
+    #
+    # returncode is set once the iteration is over
+
+    def __init__(
+        self, args, input=None, encoding="utf-8", errors="replace", timeout=None, cwd=None, env=None
+    ):
+        if isinstance(args, str):
+            args = shlex.split(args)
+        if isinstance(input, str):
+            input = input.encode(encoding)
+        self.args = args
+        self.timeout = timeout
+        self.returncode = None
+
+        self._process = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+        )
+        self._input = memoryview(input) if input is not None else None
+        # fd -> [name, incremental decoder, incomplete line]
+        self._streams = {}
+        for name, pipe in (("stdout", self._process.stdout), ("stderr", self._process.stderr)):
+            os.set_blocking(pipe.fileno(), False)
+            self._streams[pipe.fileno()] = [name, codecs.getincrementaldecoder(encoding)(errors), ""]
+        if self._input is not None:
+            os.set_blocking(self._process.stdin.fileno(), False)
+        self._deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def _read(self, fd):
+        # Reads whatever is available on fd and returns the complete lines
+        stream = self._streams[fd]
+        name, decoder, partial = stream
+        chunk = os.read(fd, CHUNK_SIZE)
+        if chunk:
+            text = partial + decoder.decode(chunk)
+        else:
+            # End of file, what is left is the last line (it has no newline)
+            text = partial + decoder.decode(b"", final=True)
+            del self._streams[fd]
+
+        # Only "\n" ends a line, the newline is kept like when iterating over a file
+        parts = text.split("\n")
+        lines = [part + "\n" for part in parts[:-1]]
+        rest = parts[-1]
+        if not chunk or len(rest) > MAX_LINE:
+            if rest:
+                lines.append(rest)
+            rest = ""
+        stream[2] = rest
+        return [(name, line) for line in lines]
+
+    def _write(self):
+        # Sends the next part of input, the pipe is non-blocking so this never waits for the child
+        stdin = self._process.stdin
+        try:
+            written = os.write(stdin.fileno(), self._input[:CHUNK_SIZE])
+            self._input = self._input[written:]
+        except BrokenPipeError:
+            self._input = self._input[:0]
+        if not self._input:
+            stdin.close()
+            self._input = None
+
+    def _remaining(self):
+        if self._deadline is None:
+            return None
+        remaining = self._deadline - time.monotonic()
+        if remaining <= 0:
+            self._kill()
+            raise subprocess.TimeoutExpired(self.args, self.timeout)
+        return remaining
+
+    def _finish(self):
+        self.returncode = self._process.wait()
+        for pipe in (self._process.stdin, self._process.stdout, self._process.stderr):
+            if pipe is not None:
+                pipe.close()
+
+    def _kill(self):
+        # The consumer stopped before the end (break, an exception, a timeout), the child is killed and reaped
+        if self._process.poll() is None:
+            self._process.kill()
+        self._finish()
+
+    def __iter__(self):
+        try:
+            with selectors.DefaultSelector() as selector:
+                for fd in self._streams:
+                    selector.register(fd, selectors.EVENT_READ)
+                if self._input is not None:
+                    selector.register(self._process.stdin.fileno(), selectors.EVENT_WRITE)
+
+                while self._streams:
+                    for key, events in selector.select(self._remaining()):
+                        if events & selectors.EVENT_WRITE:
+                            self._write()
+                            if self._input is None:
+                                selector.unregister(key.fd)
+                            continue
+                        yield from self._read(key.fd)
+                        if key.fd not in self._streams:
+                            selector.unregister(key.fd)
+        except BaseException:
+            # GeneratorExit when the loop over it was left early
+            self._kill()
+            raise
+        self._finish()
+
+    async def __aiter__(self):
+        # Same loop as __iter__, but the waiting is done by the asyncio event loop
+        # The pipes are only read when the consumer asks for more lines, so a slow consumer
+        # slows the child down through the pipe buffer instead of piling lines up in memory
+        loop = asyncio.get_running_loop()
+        try:
+            while self._streams:
+                readers = list(self._streams)
+                writers = [self._process.stdin.fileno()] if self._input is not None else []
+                ready = loop.create_future()
+
+                def wake(fd, writing):
+                    if not ready.done():
+                        ready.set_result((fd, writing))
+
+                for fd in readers:
+                    loop.add_reader(fd, wake, fd, False)
+                for fd in writers:
+                    loop.add_writer(fd, wake, fd, True)
+                try:
+                    fd, writing = await asyncio.wait_for(ready, self._remaining())
+                except asyncio.TimeoutError:
+                    self._remaining()
+                    raise
+                finally:
+                    for fd_to_remove in readers:
+                        loop.remove_reader(fd_to_remove)
+                    for fd_to_remove in writers:
+                        loop.remove_writer(fd_to_remove)
+
+                if writing:
+                    self._write()
+                else:
+                    for item in self._read(fd):
+                        yield item
+        except BaseException:
+            # Cancelled, or the async for was left early, killing is quick so it is not sent to the executor
+            self._kill()
+            raise
+        await loop.run_in_executor(None, self._finish)
+
+
+def run(args, on_stdout=None, on_stderr=None, check=False, **kwargs):
+    # Runs args and calls on_stdout(line) / on_stderr(line) for every line as soon as it is printed
+    # The lines are not kept, so the CompletedProcess has stdout and stderr set to None
+    # kwargs are passed to StreamingProcess (input, encoding, timeout, cwd, env)
+    process = StreamingProcess(args, **kwargs)
+    callbacks = {"stdout": on_stdout, "stderr": on_stderr}
+    lines = iter(process)
+    try:
+        for name, line in lines:
+            callback = callbacks[name]
+            if callback is not None:
+                callback(line)
+    finally:
+        # If a callback raised, closing the iteration kills the child instead of leaving it running
+        lines.close()
+
+    result = subprocess.CompletedProcess(process.args, process.returncode)
+    if check:
+        result.check_returncode()
+    return result
+
+
+def main():
+    # Progress lines are printed while the command is still running
+    command = "sh -c 'for i in 1 2 3; do echo step $i; echo warning $i >&2; sleep 0.5; done'"
+    start = time.perf_counter()
+    result = run(
+        command,
+        on_stdout=lambda line: print(f"{round(time.perf_counter()-start, 1)}s stdout: {line}", end=""),
+        on_stderr=lambda line: print(f"{round(time.perf_counter()-start, 1)}s stderr: {line}", end=""),
+    )
+    print("returncode: ", result.returncode)
+    print()
+
+    # A command writing a lot to both pipes, reading only stdout first would deadlock
+    command = ["sh", "-c", "seq 1 200000; seq 1 200000 >&2"]
+    counts = {"stdout": 0, "stderr": 0}
+    for name, line in StreamingProcess(command):
+        counts[name] += 1
+    print(counts)
+    print()
+
+    async def with_asyncio():
+        async for name, line in StreamingProcess(["ls", "-la", "output.txt", "doesnotexist"]):
+            print(name, line, end="")
+
+    asyncio.run(with_asyncio())
+    print()
+
+    try:
+        run("ls -la doesnotexist", on_stderr=sys.stderr.write, check=True)
+    except subprocess.CalledProcessError as err:
+        print(err)
+
+
+if __name__ == "__main__":
+    main()
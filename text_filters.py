@@ -0,0 +1,312 @@
+# grep / awk / head / tail as Python filter stages, no process is started for them
+# Every filter takes an iterator of bytes chunks and yields bytes chunks, so they can be chained
+# with each other or used as a stage of a Pipeline from subprocess_pipeline:
+#
+#   Pipeline(["cat", "output.txt"]).filter(grep("tutorial")).filter(fields(9))
+#
+# The data stays bytes, nothing is decoded, and the work is done on large blocks of lines
+# with bytes methods (find, count, split) instead of one Python loop iteration per line where possible
+
+import collections
+import itertools
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+from subprocess_pipeline import Pipeline
+
+# Reads from a file are this large, a pipe gives whatever is available (64 KiB at most on linux)
+CHUNK_SIZE = 1024 * 1024
+
+
+def read_file(filename, chunk_size=CHUNK_SIZE):
+    # The source of an in-process chain, like "cat filename"
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            yield chunk
+
+
+def blocks(chunks):
+    # Regroups chunks into blocks that end at a newline, so that no line is split between two blocks
+    # Only the last block can be without a final newline (a file not ending with one)
+    rest = b""
+    for chunk in chunks:
+        end = chunk.rfind(b"\n")
+        if end == -1:
+            rest += chunk
+            continue
+        yield rest + chunk[: end + 1]
+        rest = chunk[end + 1 :]
+    if rest:
+        yield rest
+
+
+def chain(chunks, *filters):
+    # chain(read_file("output.txt"), grep("tutorial"), fields(9)) is "cat output.txt | grep | awk"
+    for func in filters:
+        chunks = func(chunks)
+    return chunks
+
+
+def _named(func, name):
+    # The name shows up in repr(Pipeline) and in the ResourceReport of subprocess_pipeline
+    func.__name__ = name
+    return func
+
+
+def _to_bytes(value):
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
+# When more lines than this match, grep looks at every line instead of searching the whole block
+DENSE_MATCHES = 1 / 16
+
+
+def grep(pattern, invert=False, ignore_case=False):
+    # The lines matching the regex pattern, like "grep -E pattern" (-v with invert, -i with ignore_case)
+    # The pattern is searched over the whole block, only lines with a match are looked at one by one,
+    # so a block without a match costs a single regex search
+    # When most lines match that costs more than splitting the block into lines and searching each one,
+    # so the way the next block is done depends on how many lines of the previous block matched
+    # MULTILINE so that ^ and $ match at the start and end of every line of a block
+    regex = re.compile(_to_bytes(pattern), re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+    search = regex.search
+
+    def by_line(block):
+        lines = block.split(b"\n")
+        lines.pop()
+        # filter calls search from C, faster than a list comprehension
+        kept = list((itertools.filterfalse if invert else filter)(search, lines))
+        matched = len(kept) if not invert else len(lines) - len(kept)
+        if kept:
+            kept.append(b"")
+        return b"\n".join(kept), matched
+
+    def by_block(block):
+        out = []
+        matched = 0
+        position = 0
+        kept = 0
+        while True:
+            match = search(block, position)
+            if match is None or match.start() == len(block):
+                # An empty match after the last newline is not a line
+                break
+            start = block.rfind(b"\n", 0, match.start()) + 1
+            line_end = block.find(b"\n", match.start())
+            if match.end() > line_end and search(block[start:line_end]) is None:
+                # The match went over a newline (\s for example) and the line alone does not match
+                position = line_end + 1
+                continue
+            matched += 1
+            if invert:
+                # Everything between the previous matching line and this one is kept
+                out.append(block[kept:start])
+            else:
+                out.append(block[start : line_end + 1])
+            kept = position = line_end + 1
+        if invert:
+            out.append(block[kept:])
+        return b"".join(out), matched
+
+    def stage(chunks):
+        dense = False
+        for block in blocks(chunks):
+            if not block.endswith(b"\n"):
+                # Like grep, a last line without a newline gets one
+                block += b"\n"
+            out, matched = (by_line if dense else by_block)(block)
+            dense = matched > block.count(b"\n") * DENSE_MATCHES
+            if out:
+                yield out
+
+    return _named(stage, "grep({!r})".format(pattern))
+
+
+def fields(*numbers, separator=None, output_separator=b" "):
+    # The fields with these numbers of every line, counted from 1 like awk: fields(9) is "awk '{ print $9 }'"
+    # separator=None splits on runs of whitespace like awk, otherwise on that exact bytes value (-F)
+    # A line with fewer fields gives an empty value, like awk
+    separator = _to_bytes(separator)
+    output_separator = _to_bytes(output_separator)
+    indexes = [number - 1 for number in numbers]
+    # Splitting stops after the last wanted field, the rest of the line is never split
+    maxsplit = max(numbers)
+
+    def stage(chunks):
+        for block in blocks(chunks):
+            out = []
+            lines = block.split(b"\n")
+            if block.endswith(b"\n"):
+                lines.pop()
+            for line in lines:
+                parts = line.split(separator, maxsplit)
+                if len(indexes) == 1:
+                    index = indexes[0]
+                    out.append(parts[index] if index < len(parts) else b"")
+                else:
+                    out.append(output_separator.join(parts[index] if index < len(parts) else b"" for index in indexes))
+            out.append(b"")
+            yield b"\n".join(out)
+
+    return _named(stage, "fields({})".format(", ".join(str(number) for number in numbers)))
+
+
+def head(n=10):
+    # The first n lines, like "head -n"
+    # It stops reading as soon as it has them: in a Pipeline the pipe is then closed and the
+    # command before it gets SIGPIPE, like with the real head
+    def stage(chunks):
+        remaining = n
+        if remaining <= 0:
+            return
+        for chunk in chunks:
+            count = chunk.count(b"\n")
+            if count < remaining:
+                remaining -= count
+                yield chunk
+                continue
+            # The end of line number remaining is in this chunk
+            end = -1
+            for _ in range(remaining):
+                end = chunk.find(b"\n", end + 1)
+            yield chunk[: end + 1]
+            return
+
+    return _named(stage, "head({})".format(n))
+
+
+def tail(n=10):
+    # The last n lines, like "tail -n"
+    # Only the chunks holding the last n lines are kept, not the whole input
+    def stage(chunks):
+        if n <= 0:
+            for _ in chunks:
+                pass
+            return
+        # (chunk, number of newlines in it)
+        kept = collections.deque()
+        newlines = 0
+        for chunk in chunks:
+            count = chunk.count(b"\n")
+            kept.append((chunk, count))
+            newlines += count
+            # The oldest chunk can go when the others still hold more than n lines
+            while len(kept) > 1 and newlines - kept[0][1] > n:
+                newlines -= kept.popleft()[1]
+
+        data = b"".join(chunk for chunk, _ in kept)
+        # A last line without a newline counts as a line too
+        end = len(data) - 1 if data.endswith(b"\n") else len(data)
+        start = end
+        for _ in range(n):
+            start = data.rfind(b"\n", 0, start)
+            if start == -1:
+                break
+        if data:
+            yield data[start + 1 :]
+
+    return _named(stage, "tail({})".format(n))
+
+
+def write_sample_file(filename, size):
+    # Lines like the ones of output.txt (an "ls -la" listing), about size bytes
+    lines = []
+    for i in range(1_000):
+        name = "tutorial_{}.py".format(i) if i % 4 == 0 else "notes_{}.txt".format(i)
+        lines.append("-rw-r--r-- 1 Anubhav 197121 {} Feb 17 21:12 {}\n".format(1000 + i, name))
+    block = "".join(lines).encode("utf-8")
+    with open(filename, "wb") as f:
+        for _ in range(max(1, size // len(block))):
+            f.write(block)
+
+
+def benchmark(size=2 * 1024 ** 3, repeat=200):
+    # Small input, the p7 example: starting the processes is most of the work
+    print("Benchmark, grep tutorial | awk '{{ print $9 }}' on output.txt, {} times".format(repeat))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        Pipeline(["grep", "tutorial", "output.txt"], ["awk", "{ print $9 }"]).run(capture_output=True)
+    finish = time.perf_counter()
+    print(f"grep | awk (processes):    {round((finish-start) / repeat * 1e3, 3)} millisecond(s) per run")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        b"".join(chain(read_file("output.txt"), grep("tutorial"), fields(9)))
+    finish = time.perf_counter()
+    print(f"read_file | grep | fields: {round((finish-start) / repeat * 1e3, 3)} millisecond(s) per run")
+    print()
+
+    # Large input, the work on the data is all that counts
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, "listing.txt")
+    try:
+        write_sample_file(filename, size)
+        size = os.path.getsize(filename)
+        print("Benchmark on {} MB, a quarter of the lines contain tutorial".format(size // 1024 ** 2))
+
+        def measure(label, func):
+            start = time.perf_counter()
+            lines = func().count(b"\n")
+            finish = time.perf_counter()
+            print(f"{label:<42}{round(finish-start, 2):>6} second(s), {round(size / (finish-start) / 1024 ** 2):>5} MB/s, {lines} lines")
+
+        def line_by_line(word, fields):
+            # The straightforward way, every line decoded and looked at by Python
+            out = []
+            with open(filename, "r", encoding="utf-8") as f:
+                for line in f:
+                    if word in line:
+                        out.append(line.split()[8] if fields else line)
+            return "".join(value + "\n" if fields else value for value in out).encode("utf-8")
+
+        measure(
+            "grep tutorial | awk (processes):",
+            lambda: Pipeline(["grep", "tutorial", filename], ["awk", "{ print $9 }"]).run(capture_output=True).stdout,
+        )
+        measure(
+            "cat | grep() | fields() (hybrid):",
+            lambda: Pipeline(["cat", filename]).filter(grep("tutorial")).filter(fields(9)).run(capture_output=True).stdout,
+        )
+        measure(
+            "read_file | grep() | fields():",
+            lambda: b"".join(chain(read_file(filename), grep("tutorial"), fields(9))),
+        )
+        measure("for line in file (decoded):", lambda: line_by_line("tutorial", True))
+        print()
+
+        # A pattern found on few lines, most blocks cost a single regex search
+        measure("grep tutorial_996 (process):", lambda: subprocess.run(["grep", "tutorial_996", filename], capture_output=True).stdout)
+        measure("read_file | grep():", lambda: b"".join(chain(read_file(filename), grep("tutorial_996"))))
+        measure("for line in file (decoded):", lambda: line_by_line("tutorial_996", False))
+        print()
+
+        # tail -n reads the file backwards from the end, a stream has to be read to the end
+        measure("tail -n 5 (process, seeks to the end):", lambda: subprocess.run(["tail", "-n", "5", filename], capture_output=True).stdout)
+        measure("cat | tail -n 5 (processes):", lambda: Pipeline(["cat", filename], ["tail", "-n", "5"]).run(capture_output=True).stdout)
+        measure("read_file | tail(5):", lambda: b"".join(chain(read_file(filename), tail(5))))
+        measure("read_file | head(5):", lambda: b"".join(chain(read_file(filename), head(5))))
+    finally:
+        shutil.rmtree(directory)
+    print()
+
+
+def main():
+    # p7 of tutorial_7 without grep and awk processes
+    print(b"".join(chain(read_file("output.txt"), grep("tutorial"), fields(9))).decode("utf-8"))
+
+    # Mixed with commands, ls runs as a process and the filters in this process
+    p8 = Pipeline(["ls", "-la"]) | grep(r"\.py$") | fields(5, 9) | head(3)
+    print(repr(p8))
+    print(p8.run(capture_output=True, text=True).stdout)
+
+    print(b"".join(chain(read_file("output.txt"), grep("tutorial", invert=True), tail(3))).decode("utf-8"))
+
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+# One thread pool for the whole process, it grows when tasks have to wait and shrinks when threads are idle
+# tutorial_8 opens a new ThreadPoolExecutor in every "with" block, so threads are started and stopped for
+# every batch. Switching an example over is one line:
+#
+#   with concurrent.futures.ThreadPoolExecutor() as executor:
+#   with thread_pool.shared_executor() as executor:
+#
+# submit, map and as_completed work the same, and leaving the with block still waits for the tasks
+# submitted in it, but the threads stay in the pool for the next block
+
+import atexit
+import collections
+import concurrent.futures
+import os
+import threading
+import time
+
+# as_completed and wait are the ones from concurrent.futures, they work with any future
+as_completed = concurrent.futures.as_completed
+wait = concurrent.futures.wait
+
+# Defaults of the shared pool
+MAX_WORKERS = 64
+# A new thread is started when the oldest queued task has waited longer than this
+TARGET_WAIT = 0.01
+# A thread that has had nothing to do for this long exits
+IDLE_TIMEOUT = 5.0
+
+
+class AdaptiveThreadPool(concurrent.futures.Executor):
+    # A thread pool whose size follows the load
+    #   - a task that finds an idle thread runs right away
+    #   - a supervisor thread watches the queue, while the oldest task has waited longer than target_wait
+    #     it starts one more thread every target_wait, up to max_workers
+    #   - a thread waiting for work longer than idle_timeout exits, down to min_workers
+    # Short waits are accepted, so a burst of quick tasks is run by the threads already there
+    # instead of starting one thread per task
+
+    def __init__(
+        self, min_workers=0, max_workers=MAX_WORKERS, target_wait=TARGET_WAIT, idle_timeout=IDLE_TIMEOUT, name="pool"
+    ):
+        if max_workers < 1 or min_workers < 0 or min_workers > max_workers:
+            raise ValueError("need 0 <= min_workers <= max_workers and max_workers >= 1")
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.target_wait = target_wait
+        self.idle_timeout = idle_timeout
+        self.name = name
+
+        # (future, fn, args, kwargs, time it was queued)
+        self._queue = collections.deque()
+        lock = threading.Lock()
+        # Workers wait on _work_ready, the supervisor on _queued, both share the same lock
+        self._work_ready = threading.Condition(lock)
+        self._queued = threading.Condition(lock)
+        self._lock = lock
+        self._threads = set()
+        self._idle = 0
+        self._shutdown = False
+        self._supervisor = None
+        self._thread_number = 0
+
+        # Counters for stats()
+        self.started_threads = 0
+        self.exited_threads = 0
+        self.peak_size = 0
+        self.completed = 0
+
+        for _ in range(min_workers):
+            self._start_worker()
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = concurrent.futures.Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            self._queue.append((future, fn, args, kwargs, time.monotonic()))
+            if self._idle:
+                self._work_ready.notify()
+            elif not self._threads:
+                # Nobody to run it at all, no point waiting for the supervisor
+                self._start_worker()
+            if len(self._queue) == 1:
+                self._queued.notify()
+            if self._supervisor is None:
+                self._supervisor = threading.Thread(
+                    target=self._supervise, name="{}-supervisor".format(self.name), daemon=True
+                )
+                self._supervisor.start()
+        return future
+
+    def _start_worker(self):
+        # Called with the lock held
+        self._thread_number += 1
+        thread = threading.Thread(target=self._work, name="{}-{}".format(self.name, self._thread_number), daemon=True)
+        self._threads.add(thread)
+        self.started_threads += 1
+        self.peak_size = max(self.peak_size, len(self._threads))
+        thread.start()
+
+    def _supervise(self):
+        with self._lock:
+            while not self._shutdown:
+                if not self._queue:
+                    self._queued.wait()
+                    continue
+                if len(self._threads) >= self.max_workers:
+                    # No thread can be added, wait until a worker exits or finishes a task
+                    self._queued.wait()
+                    continue
+                waited = time.monotonic() - self._queue[0][4]
+                if waited >= self.target_wait:
+                    self._start_worker()
+                    # Give the new thread one target_wait to make a difference before starting another
+                    waited = 0
+                self._queued.wait(self.target_wait - waited)
+
+    def _work(self):
+        while True:
+            with self._lock:
+                while not self._queue:
+                    if self._shutdown:
+                        self._threads.discard(threading.current_thread())
+                        self.exited_threads += 1
+                        return
+                    self._idle += 1
+                    woken = self._work_ready.wait(self.idle_timeout)
+                    self._idle -= 1
+                    if not woken and not self._queue and len(self._threads) > self.min_workers:
+                        self._threads.discard(threading.current_thread())
+                        self.exited_threads += 1
+                        self._queued.notify()
+                        return
+                future, fn, args, kwargs, _ = self._queue.popleft()
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as err:
+                    future.set_exception(err)
+                else:
+                    future.set_result(result)
+            # No reference to the task is kept while waiting for the next one
+            del future, fn, args, kwargs
+            with self._lock:
+                self.completed += 1
+                if self._queue:
+                    self._queued.notify()
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while self._queue:
+                    self._queue.popleft()[0].cancel()
+            # The workers finish what is left in the queue, then exit
+            self._work_ready.notify_all()
+            self._queued.notify_all()
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    @property
+    def size(self):
+        return len(self._threads)
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._threads),
+                "idle": self._idle,
+                "busy": len(self._threads) - self._idle,
+                "queue_depth": len(self._queue),
+                "oldest_wait": time.monotonic() - self._queue[0][4] if self._queue else 0.0,
+                "peak_size": self.peak_size,
+                "started_threads": self.started_threads,
+                "exited_threads": self.exited_threads,
+                "completed": self.completed,
+            }
+
+    def __repr__(self):
+        return "AdaptiveThreadPool({} threads, {} idle, {} queued)".format(
+            len(self._threads), self._idle, len(self._queue)
+        )
+
+
+class PoolSession(concurrent.futures.Executor):
+    # What shared_executor() returns, it submits to the shared pool and remembers its own futures
+    # shutdown (and so the end of a with block) waits for those futures only,
+    # the pool itself keeps running for the rest of the process
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._futures = set()
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, fn, /, *args, **kwargs):
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            future = self.pool.submit(fn, *args, **kwargs)
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._lock:
+            self._shutdown = True
+            futures = list(self._futures)
+        if cancel_futures:
+            for future in futures:
+                future.cancel()
+        if wait:
+            concurrent.futures.wait(futures)
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool():
+    # The pool of this process, created the first time it is needed
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = AdaptiveThreadPool(name="shared-pool")
+        return _shared_pool
+
+
+def shared_executor():
+    return PoolSession(shared_pool())
+
+
+def _shutdown_shared_pool():
+    if _shared_pool is not None:
+        _shared_pool.shutdown(wait=True)
+
+
+def _forget_shared_pool():
+    # A child made with fork has none of the threads of the parent, it starts its own pool when needed
+    global _shared_pool, _shared_lock
+    _shared_pool = None
+    _shared_lock = threading.Lock()
+
+
+atexit.register(_shutdown_shared_pool)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_shared_pool)
+
+
+def do_something(seconds):
+    # Same as tutorial_8, without the print
+    time.sleep(seconds)
+    return f"Done Sleeping for {seconds} second..."
+
+
+def benchmark(batches=1_000, tasks=10):
+    print("Benchmark, {} with blocks of {} quick tasks".format(batches, tasks))
+
+    start = time.perf_counter()
+    for _ in range(batches):
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            list(executor.map(abs, range(tasks)))
+    finish = time.perf_counter()
+    print(f"new ThreadPoolExecutor per block: {round(finish-start, 2)} second(s)")
+
+    start = time.perf_counter()
+    for _ in range(batches):
+        with shared_executor() as executor:
+            list(executor.map(abs, range(tasks)))
+    finish = time.perf_counter()
+    print(f"shared_executor per block:        {round(finish-start, 2)} second(s)")
+    print(shared_pool().stats())
+    print()
+
+
+def main():
+    # Example 3 of tutorial_8, only the with line is different
+    start = time.perf_counter()
+    with shared_executor() as executor:
+        secs = [3, 2.5, 1.5, 1]
+        results = executor.map(do_something, secs)
+        for result in results:
+            print(result)
+    finish = time.perf_counter()
+    print(f"Finished in {round(finish-start, 2)} second(s)")
+    print()
+
+    # as_completed, the threads of the previous block are reused
+    with shared_executor() as executor:
+        results = [executor.submit(do_something, 0.5) for _ in range(10)]
+        for f in as_completed(results):
+            f.result()
+    print(shared_pool().stats())
+    print()
+
+    # A burst of slow tasks, the pool grows while tasks wait and shrinks back once they are done
+    pool = AdaptiveThreadPool(max_workers=32, idle_timeout=0.5, name="burst")
+    futures = [pool.submit(do_something, 0.2) for _ in range(200)]
+    for _ in range(6):
+        time.sleep(0.25)
+        print(pool.stats())
+    wait(futures)
+    time.sleep(1)
+    print("after the idle timeout:", pool)
+    pool.shutdown()
+    print()
+
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# Getting the return values of manual threads without the lambda + queue.Queue of tutorial_8
+# With que.put(do_something(seconds)) the results come back in the order the threads happened to finish,
+# nothing says which thread a result is from, an exception in a thread is only printed and lost,
+# and "while not que.empty()" stops early if a thread has not put its result yet
+#
+# ResultCollector gives every started thread a slot in lists allocated up front, the thread writes
+# its result (or exception) and timestamps into its own slot only, so no lock is needed to collect them
+# start() returns a handle to get that one result, and the collector gives all of them
+# in start order, in completion order or in batches
+
+import concurrent.futures
+import itertools
+import queue
+import threading
+import time
+
+
+class TaskHandle(object):
+    # One started thread, like a Future for a manual thread
+
+    def __init__(self, collector, index, thread):
+        self.collector = collector
+        self.index = index
+        self.thread = thread
+
+    def done(self):
+        return self.collector._finished[self.index] is not None
+
+    def wait(self, timeout=None):
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            raise concurrent.futures.TimeoutError()
+
+    def result(self, timeout=None):
+        # Waits for the thread and returns what the function returned, or raises what it raised
+        self.wait(timeout)
+        error = self.collector._errors[self.index]
+        if error is not None:
+            raise error
+        return self.collector._results[self.index]
+
+    def exception(self, timeout=None):
+        self.wait(timeout)
+        return self.collector._errors[self.index]
+
+    @property
+    def started(self):
+        # time.perf_counter() when the function started running in the thread
+        return self.collector._started[self.index]
+
+    @property
+    def finished(self):
+        return self.collector._finished[self.index]
+
+    @property
+    def duration(self):
+        if self.finished is None:
+            return None
+        return self.finished - self.started
+
+    def __repr__(self):
+        state = "finished" if self.done() else "running"
+        return "TaskHandle({}, {})".format(self.index, state)
+
+
+class ResultCollector(object):
+    # capacity is the number of threads that can be started, the slots are made once for all of them
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._results = [None] * capacity
+        self._errors = [None] * capacity
+        self._started = [None] * capacity
+        self._finished = [None] * capacity
+        self._handles = [None] * capacity
+        # start() is meant to be called from the thread that owns the collector
+        self._next_index = itertools.count()
+        self._started_count = 0
+        # The index of each finished task, in the order they finished
+        # SimpleQueue is the only thing shared between the threads, its put never blocks
+        self._completed = queue.SimpleQueue()
+        self._taken = 0
+
+    def start(self, target, *args, **kwargs):
+        index = next(self._next_index)
+        if index >= self.capacity:
+            raise IndexError("all {} slots of the collector are used".format(self.capacity))
+        thread = threading.Thread(target=self._run, args=(index, target, args, kwargs))
+        handle = TaskHandle(self, index, thread)
+        self._handles[index] = handle
+        thread.start()
+        self._started_count += 1
+        return handle
+
+    def _run(self, index, target, args, kwargs):
+        self._started[index] = time.perf_counter()
+        try:
+            self._results[index] = target(*args, **kwargs)
+        except BaseException as err:
+            self._errors[index] = err
+        finally:
+            self._finished[index] = time.perf_counter()
+            self._completed.put(index)
+
+    def __len__(self):
+        return self._started_count
+
+    def __getitem__(self, index):
+        return self._handles[index]
+
+    def join(self):
+        for handle in self._handles[: self._started_count]:
+            handle.wait()
+
+    def results(self, return_exceptions=False):
+        # All the results in the order the threads were started, like executor.map
+        # The first exception is raised unless return_exceptions=True, then it is put in the list
+        results = []
+        for handle in self._handles[: self._started_count]:
+            error = handle.exception()
+            if error is not None and not return_exceptions:
+                raise error
+            results.append(error if error is not None else handle.result())
+        return results
+
+    def as_completed(self, timeout=None):
+        # The handles in the order the threads finished, like concurrent.futures.as_completed
+        # Every handle is given out once, over all the calls of as_completed and batches
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self._taken < self._started_count:
+            yield self._take(deadline)
+
+    def batches(self, size, timeout=None):
+        # Lists of at most size handles: it waits for one to finish, then takes every other one
+        # that has finished by then, so results that arrive together are handled together
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self._taken < self._started_count:
+            batch = [self._take(deadline)]
+            while len(batch) < size and self._taken < self._started_count:
+                try:
+                    index = self._completed.get_nowait()
+                except queue.Empty:
+                    break
+                self._taken += 1
+                batch.append(self._handles[index])
+            yield batch
+
+    def _take(self, deadline):
+        remaining = None if deadline is None else max(0, deadline - time.monotonic())
+        try:
+            index = self._completed.get(timeout=remaining)
+        except queue.Empty:
+            raise concurrent.futures.TimeoutError() from None
+        self._taken += 1
+        return self._handles[index]
+
+
+def do_something(seconds):
+    time.sleep(seconds)
+    return f"Done Sleeping for {seconds} second..."
+
+
+def fail(seconds):
+    time.sleep(seconds)
+    raise ValueError("failed after {} second(s)".format(seconds))
+
+
+def main():
+    # The manual threading example of tutorial_8
+    start = time.perf_counter()
+    collector = ResultCollector(10)
+    handles = [collector.start(do_something, 1.5) for _ in range(10)]
+    # No race, result() waits for that thread
+    print(handles[0].result())
+    print(collector.results()[-1])
+    finish = time.perf_counter()
+    print(f"Finished in {round(finish-start, 2)} second(s)")
+    print()
+
+    # Completion order, each result knows which thread it came from and when it ran
+    collector = ResultCollector(5)
+    start = time.perf_counter()
+    for seconds in [3, 2.5, 1.5, 1, 0.5]:
+        collector.start(fail if seconds == 1.5 else do_something, seconds)
+    for handle in collector.as_completed():
+        outcome = handle.exception() or handle.result()
+        print(
+            f"task {handle.index}: started at {round(handle.started - start, 2)}, "
+            f"took {round(handle.duration, 2)} second(s): {outcome!r}"
+        )
+    print(collector.results(return_exceptions=True))
+    print()
+
+    # Batches, while one batch is handled (0.2 second here) the next one fills up
+    collector = ResultCollector(20)
+    for i in range(20):
+        collector.start(do_something, 0.05 * i)
+    for batch in collector.batches(8):
+        print([handle.index for handle in batch])
+        time.sleep(0.2)
+    print()
+
+    # Overhead per thread compared with the lambda + queue.Queue way
+    n = 10_000
+    start = time.perf_counter()
+    que = queue.Queue()
+    threads = [threading.Thread(target=lambda queue, number: queue.put(abs(number)), args=[que, i]) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    while not que.empty():
+        que.get()
+    finish = time.perf_counter()
+    print(f"{n} threads with queue.Queue:      {round(finish-start, 2)} second(s)")
+
+    start = time.perf_counter()
+    collector = ResultCollector(n)
+    for i in range(n):
+        collector.start(abs, i)
+    collector.results()
+    finish = time.perf_counter()
+    print(f"{n} threads with ResultCollector: {round(finish-start, 2)} second(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+# Timed waits without a thread per wait
+# do_something in tutorial_8 is time.sleep(seconds), a thread of the pool is blocked the whole time,
+# so 10,000 sleeps need 10,000 threads, or take 10,000 / max_workers rounds of the pool
+# TimerScheduler keeps every deadline in a heap and one thread sleeps until the nearest one,
+# when a deadline is reached its Future is completed, so any number of timers cost one thread
+
+import concurrent.futures
+import heapq
+import itertools
+import random
+import statistics
+import threading
+import time
+
+
+class TimerScheduler(object):
+    # call_later(delay, fn, *args) - fn(*args) runs on the scheduler thread after delay seconds,
+    #                                the returned Future gets its result
+    # sleep(seconds, result)       - a Future completed with result after seconds, the timed wait itself
+    # submit_later(executor, delay, fn, *args)
+    #                              - fn is submitted to executor after delay, for work that takes time
+    # The functions given to call_later run on the scheduler thread and hold up the timers after them,
+    # they have to be quick (completing a Future, putting something in a queue...)
+    # future.cancel() stops a timer that has not fired yet
+
+    def __init__(self, name="timers"):
+        self.name = name
+        # (deadline, sequence number, future, fn, args, kwargs), the sequence number keeps the order
+        # of timers with the same deadline and means futures are never compared
+        self._heap = []
+        self._sequence = itertools.count()
+        # The scheduler thread waits on _condition, wait_idle on _idle, both share the same lock
+        lock = threading.RLock()
+        self._condition = threading.Condition(lock)
+        self._idle = threading.Condition(lock)
+        # Timers that have neither fired nor been cancelled, cancelled ones still in the heap are not counted
+        self._live = 0
+        self._thread = None
+        # _closed refuses new timers, _shutdown stops the scheduler thread
+        self._closed = False
+        self._shutdown = False
+        self.fired = 0
+
+    def call_at(self, deadline, fn=None, *args, **kwargs):
+        # deadline is a time.monotonic() value
+        future = concurrent.futures.Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("cannot schedule new timers after shutdown")
+            heapq.heappush(self._heap, (deadline, next(self._sequence), future, fn, args, kwargs))
+            self._live += 1
+            # The scheduler thread only has to wake up when this is the new nearest deadline
+            if self._heap[0][2] is future:
+                self._condition.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        future.add_done_callback(self._timer_done)
+        return future
+
+    def _timer_done(self, future):
+        # Called once a timer has fired or has been cancelled
+        with self._condition:
+            self._live -= 1
+            if not self._live:
+                self._idle.notify_all()
+
+    def call_later(self, delay, fn=None, *args, **kwargs):
+        return self.call_at(time.monotonic() + delay, fn, *args, **kwargs)
+
+    def sleep(self, seconds, result=None):
+        # The Future version of time.sleep(seconds), with asyncio.sleep's result argument
+        return self.call_later(seconds, _identity, result)
+
+    def submit_later(self, executor, delay, fn, *args, **kwargs):
+        # The returned Future follows the one of executor.submit, which is only made after delay
+        future = concurrent.futures.Future()
+
+        def submit():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                inner = executor.submit(fn, *args, **kwargs)
+            except BaseException as err:
+                # The executor is shut down, or fn could not be queued
+                future.set_exception(err)
+                return
+            _chain(inner, future)
+
+        def timer_done(timer):
+            # A timer cancelled by shutdown() cancels the returned future, it would never be completed otherwise
+            if timer.cancelled():
+                future.cancel()
+            elif timer.exception() is not None and not future.done():
+                future.set_exception(timer.exception())
+
+        timer = self.call_later(delay, submit)
+        timer.add_done_callback(timer_done)
+        # Cancelling the returned future before the delay cancels the timer too
+        future.add_done_callback(lambda _: timer.cancel())
+        return future
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._shutdown:
+                        return
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._condition.wait(wait)
+                # Everything that is due is taken at once, the lock is not held while they run
+                now = time.monotonic()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap))
+
+            for _, _, future, fn, args, kwargs in due:
+                # A cancelled timer just stays in the heap until its deadline and is skipped here
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    result = fn(*args, **kwargs) if fn is not None else None
+                except BaseException as err:
+                    future.set_exception(err)
+                else:
+                    future.set_result(result)
+            self.fired += len(due)
+            del due
+
+    @property
+    def pending(self):
+        # Timers that will still fire
+        return self._live
+
+    def wait_idle(self, timeout=None):
+        # Waits until every timer has fired or been cancelled, False if timeout ran out first
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._live, timeout)
+
+    def shutdown(self, cancel=True):
+        # The timers that have not fired are cancelled, or with cancel=False they still fire
+        # at their deadline and shutdown returns after the last one
+        with self._condition:
+            self._closed = True
+        if not cancel:
+            self.wait_idle()
+        with self._condition:
+            self._shutdown = True
+            heap, self._heap = self._heap, []
+            self._condition.notify()
+        # With cancel=False only timers cancelled by their owner are left, they are skipped
+        for _, _, future, _, _, _ in heap:
+            future.cancel()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+def _identity(value):
+    return value
+
+
+def _chain(source, target):
+    # Copies the outcome of source into target once source is done
+    def copy(source):
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+
+    source.add_done_callback(copy)
+
+
+class DelayedExecutor(concurrent.futures.Executor):
+    # An executor with submit_later next to submit, the waiting is done by the scheduler and not by a worker
+    #
+    #   with DelayedExecutor(concurrent.futures.ThreadPoolExecutor()) as executor:
+    #       executor.submit(fn, 1)
+    #       executor.submit_later(1.5, fn, 2)
+
+    def __init__(self, executor, scheduler=None):
+        self.executor = executor
+        self.scheduler = scheduler if scheduler is not None else TimerScheduler()
+        self._owns_scheduler = scheduler is None
+
+    def submit(self, fn, /, *args, **kwargs):
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def submit_later(self, delay, fn, /, *args, **kwargs):
+        return self.scheduler.submit_later(self.executor, delay, fn, *args, **kwargs)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        if self._owns_scheduler:
+            # With wait=True the delayed tasks are still submitted before the executor is shut down
+            self.scheduler.shutdown(cancel=not wait or cancel_futures)
+        self.executor.shutdown(wait, cancel_futures=cancel_futures)
+
+
+def benchmark(n=100_000, spread=2.0, lead=5.0):
+    # The deadlines start lead seconds from now, so that all timers are in the heap before the first one is due
+    print("Benchmark, {} timers spread over {} second(s)".format(n, spread))
+    random.seed(0)
+    lateness = []
+    all_fired = threading.Event()
+
+    def fired(deadline):
+        lateness.append(time.monotonic() - deadline)
+        if len(lateness) == n:
+            all_fired.set()
+
+    with TimerScheduler() as scheduler:
+        base = time.monotonic() + lead
+        deadlines = [base + random.uniform(0, spread) for _ in range(n)]
+        start = time.perf_counter()
+        for deadline in deadlines:
+            scheduler.call_at(deadline, fired, deadline)
+        finish = time.perf_counter()
+        print(f"scheduled at {round(n / (finish-start))} timers/second, {scheduler.pending} pending")
+        all_fired.wait()
+    lateness.sort()
+    print(
+        f"lateness: median {round(statistics.median(lateness) * 1e3, 3)} ms, "
+        f"p99 {round(lateness[int(len(lateness) * 0.99)] * 1e3, 3)} ms, max {round(lateness[-1] * 1e3, 3)} ms"
+    )
+
+    # Every timer due at the same moment, how fast the scheduler thread gets through them
+    lateness.clear()
+    all_fired.clear()
+    with TimerScheduler() as scheduler:
+        deadline = time.monotonic() + lead
+        for _ in range(n):
+            scheduler.call_at(deadline, fired, deadline)
+        all_fired.wait()
+    print(f"{n} timers due at once fired at {round(n / lateness[-1])} timers/second")
+    print()
+
+    # The same number of sleeps on a thread pool, one blocked thread per sleep
+    m = 1_000
+    print("Benchmark, {} sleeps of 0.1 second".format(m))
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        list(executor.map(time.sleep, [0.1] * m))
+    finish = time.perf_counter()
+    print(f"ThreadPoolExecutor:   {round(finish-start, 2)} second(s)")
+
+    start = time.perf_counter()
+    with TimerScheduler() as scheduler:
+        concurrent.futures.wait([scheduler.sleep(0.1) for _ in range(m)])
+    finish = time.perf_counter()
+    print(f"TimerScheduler.sleep: {round(finish-start, 2)} second(s)")
+    print()
+
+
+def do_something(seconds):
+    # tutorial_8's do_something, run on a pool thread by submit_later when its delay is over
+    return f"Done Sleeping for {seconds} second..."
+
+
+def main():
+    # Example 2 of tutorial_8 without a blocked thread per sleep
+    start = time.perf_counter()
+    with TimerScheduler() as scheduler:
+        secs = [3, 2.5, 1.5, 1]
+        results = [scheduler.sleep(sec, f"Done Sleeping for {sec} second...") for sec in secs]
+        for f in concurrent.futures.as_completed(results):
+            print(f.result())
+    finish = time.perf_counter()
+    print(f"Finished in {round(finish-start, 2)} second(s)")
+    print()
+
+    # Delayed submit next to the executor
+    with DelayedExecutor(concurrent.futures.ThreadPoolExecutor()) as executor:
+        now = executor.submit(do_something, 0)
+        later = executor.submit_later(1.5, do_something, 1.5)
+        cancelled = executor.submit_later(1, do_something, 1)
+        cancelled.cancel()
+        print(now.result())
+        print(later.result())
+        print("cancelled:", cancelled.cancelled())
+    print()
+
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# Per task timings for thread and process pools
+# The examples of tutorial_8 and tutorial_9 only time a whole with block with perf_counter,
+# that does not show how long tasks waited in the queue, how busy each worker was, or which task was slow
+# TracedExecutor wraps an executor and records for every task:
+#   when it was submitted, when it started and ended, the worker (pid and thread) and the exception if any
+# The records give latency histograms and a Chrome trace (open it in chrome://tracing or ui.perfetto.dev)
+
+import collections
+import concurrent.futures
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+# Only the last records are kept, so the tracer can stay on in a long running program
+MAX_RECORDS = 1_000_000
+
+# submitted, started, ended are time.perf_counter_ns() values, the same clock in every process on linux
+TaskRecord = collections.namedtuple(
+    "TaskRecord", ["name", "submitted", "started", "ended", "pid", "thread_id", "thread_name", "error"]
+)
+
+
+class _TracedCall(object):
+    # What is really submitted, it times fn where it runs
+    # In a thread pool the record is added to records directly, from a process pool it has to be sent back
+    # with the result, records is None then (the class is at module level so it can be pickled)
+
+    def __init__(self, fn, submitted, records):
+        self.fn = fn
+        self.submitted = submitted
+        self.records = records
+
+    def __call__(self, *args, **kwargs):
+        started = time.perf_counter_ns()
+        error = None
+        try:
+            result = self.fn(*args, **kwargs)
+        except BaseException as err:
+            error = err
+        ended = time.perf_counter_ns()
+        thread = threading.current_thread()
+        record = TaskRecord(
+            getattr(self.fn, "__name__", repr(self.fn)),
+            self.submitted,
+            started,
+            ended,
+            os.getpid(),
+            thread.ident,
+            thread.name,
+            repr(error) if error is not None else None,
+        )
+        if self.records is not None:
+            # deque.append is atomic, no lock
+            self.records.append(record)
+            if error is not None:
+                raise error
+            return result
+        return result if error is None else None, error, record
+
+    def __getstate__(self):
+        return {"fn": self.fn, "submitted": self.submitted, "records": None}
+
+
+class _ProcessFuture(concurrent.futures.Future):
+    # The Future given out for a process pool task, it is completed from the Future of the pool
+    # cancel() asks the pool first, a task already running in a worker cannot be cancelled (like ProcessPoolExecutor)
+
+    def __init__(self, inner):
+        super().__init__()
+        self._inner = inner
+
+    def cancel(self):
+        # When the pool cancels the task, the done callback of inner cancels this Future
+        if not self._inner.cancel():
+            return False
+        return super().cancel()
+
+
+class TracedExecutor(concurrent.futures.Executor):
+    # TracedExecutor(concurrent.futures.ThreadPoolExecutor()) is used like the executor it wraps
+    # With a thread pool the Future of the executor itself is returned, the only cost is timing the call
+    # With a process pool a second Future is made (_ProcessFuture), it gets the result once the record is taken out of it
+
+    def __init__(self, executor, max_records=MAX_RECORDS):
+        self.executor = executor
+        self.records = collections.deque(maxlen=max_records)
+        self._in_process = isinstance(executor, concurrent.futures.ThreadPoolExecutor)
+        self.started = time.perf_counter_ns()
+
+    def submit(self, fn, /, *args, **kwargs):
+        submitted = time.perf_counter_ns()
+        if self._in_process:
+            return self.executor.submit(_TracedCall(fn, submitted, self.records), *args, **kwargs)
+
+        inner = self.executor.submit(_TracedCall(fn, submitted, None), *args, **kwargs)
+        outer = _ProcessFuture(inner)
+
+        def done(inner):
+            if inner.cancelled():
+                concurrent.futures.Future.cancel(outer)
+                return
+            # outer is only cancelled together with inner, so a task that ran always has its record kept
+            outer.set_running_or_notify_cancel()
+            if inner.exception() is not None:
+                # The worker process died (BrokenProcessPool) or the arguments could not be pickled
+                outer.set_exception(inner.exception())
+                return
+            result, error, record = inner.result()
+            self.records.append(record)
+            if error is not None:
+                outer.set_exception(error)
+            else:
+                outer.set_result(result)
+
+        inner.add_done_callback(done)
+        return outer
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.executor.shutdown(wait, cancel_futures=cancel_futures)
+
+    def summary(self, stragglers=3):
+        # Percentiles of queue wait, run time and latency (submit to end) in milliseconds,
+        # how busy every worker was over the traced time, and the slowest tasks
+        records = list(self.records)
+        if not records:
+            return {"tasks": 0}
+        begin = min(record.submitted for record in records)
+        end = max(record.ended for record in records)
+
+        busy = collections.Counter()
+        for record in records:
+            busy["{}/{}".format(record.pid, record.thread_name)] += record.ended - record.started
+
+        return {
+            "tasks": len(records),
+            "errors": sum(1 for record in records if record.error is not None),
+            "queue_wait_ms": _percentiles([record.started - record.submitted for record in records]),
+            "run_time_ms": _percentiles([record.ended - record.started for record in records]),
+            "latency_ms": _percentiles([record.ended - record.submitted for record in records]),
+            "utilization": {worker: round(time_busy / (end - begin), 3) for worker, time_busy in sorted(busy.items())},
+            "stragglers": [
+                {"name": record.name, "run_time_ms": (record.ended - record.started) / 1e6, "error": record.error}
+                for record in sorted(records, key=lambda record: record.ended - record.started)[-stragglers:][::-1]
+            ],
+        }
+
+    def histograms(self):
+        # Number of tasks per power of two microseconds, {"queue_wait": {upper bound in us: count}, ...}
+        histograms = {"queue_wait": collections.Counter(), "run_time": collections.Counter(), "latency": collections.Counter()}
+        for record in self.records:
+            for name, nanoseconds in (
+                ("queue_wait", record.started - record.submitted),
+                ("run_time", record.ended - record.started),
+                ("latency", record.ended - record.submitted),
+            ):
+                histograms[name][1 << (nanoseconds // 1000).bit_length()] += 1
+        return {name: dict(sorted(counts.items())) for name, counts in histograms.items()}
+
+    def chrome_trace(self):
+        # The trace_event format: an "X" event per task in the lane of the worker that ran it,
+        # and a flow arrow from the submit to the start, so the queue wait shows as the gap
+        events = []
+        submitter = os.getpid()
+        lanes = {}
+        for number, record in enumerate(self.records):
+            lanes[(record.pid, record.thread_id)] = record.thread_name
+            submitted = (record.submitted - self.started) / 1000
+            started = (record.started - self.started) / 1000
+            events.append(
+                {
+                    "name": record.name,
+                    "cat": "task",
+                    "ph": "X",
+                    "ts": started,
+                    "dur": (record.ended - record.started) / 1000,
+                    "pid": record.pid,
+                    "tid": record.thread_id,
+                    "args": {"queue_wait_us": started - submitted, "error": record.error},
+                }
+            )
+            events.append({"name": "submit", "cat": "queue", "ph": "s", "id": number, "ts": submitted, "pid": submitter, "tid": 0})
+            events.append(
+                {"name": "submit", "cat": "queue", "ph": "f", "bp": "e", "id": number, "ts": started, "pid": record.pid, "tid": record.thread_id}
+            )
+        events.append({"name": "thread_name", "ph": "M", "pid": submitter, "tid": 0, "args": {"name": "submit"}})
+        for (pid, thread_id), thread_name in lanes.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": thread_name}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, filename):
+        with open(filename, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+def _percentiles(nanoseconds, percentiles=(50, 90, 99)):
+    values = sorted(nanoseconds)
+    result = {"p{}".format(p): values[min(len(values) - 1, len(values) * p // 100)] / 1e6 for p in percentiles}
+    result["max"] = values[-1] / 1e6
+    return result
+
+
+def do_something(seconds):
+    time.sleep(seconds)
+    if seconds > 0.45:
+        raise ValueError("took too long")
+    return f"Done Sleeping for {seconds} second..."
+
+
+def square(number):
+    return number * number
+
+
+def benchmark(n=100_000):
+    print("Benchmark, overhead of tracing {} tiny tasks".format(n))
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        start = time.perf_counter()
+        list(executor.map(square, range(n)))
+        finish = time.perf_counter()
+    plain = finish - start
+    print(f"ThreadPoolExecutor:         {round(plain, 2)} second(s)")
+
+    with TracedExecutor(concurrent.futures.ThreadPoolExecutor()) as executor:
+        start = time.perf_counter()
+        list(executor.map(square, range(n)))
+        finish = time.perf_counter()
+    print(f"TracedExecutor around it:   {round(finish-start, 2)} second(s), "
+          f"{round((finish - start - plain) / n * 1e6, 2)} microsecond(s) more per task")
+    print()
+
+
+def main():
+    # Example 2 of tutorial_8 and example_7 of tutorial_9 with a trace
+    random.seed(1)
+    secs = [round(random.uniform(0.05, 0.5), 2) for _ in range(40)]
+    for make in (concurrent.futures.ThreadPoolExecutor, concurrent.futures.ProcessPoolExecutor):
+        start = time.perf_counter()
+        with TracedExecutor(make(max_workers=4)) as executor:
+            results = [executor.submit(do_something, sec) for sec in secs]
+            failed = sum(1 for f in concurrent.futures.as_completed(results) if f.exception() is not None)
+        finish = time.perf_counter()
+        print(f"{make.__name__}: finished in {round(finish-start, 2)} second(s), {failed} failed")
+        print(json.dumps(executor.summary(), indent=2))
+        print(executor.histograms()["queue_wait"])
+        filename = os.path.join(tempfile.gettempdir(), "trace_{}.json".format(make.__name__))
+        executor.write_chrome_trace(filename)
+        print("trace written to", filename)
+        print()
+
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()